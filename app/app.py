@@ -1,13 +1,14 @@
 import streamlit as st
 from data_loader import (
     get_dash_dir,
+    get_cube_dir,
+    list_cube_years,
     ensure_files_exist,
     load_core_table,
     load_routes_table,
-    load_airlines_lookup,
+    load_airline_mapper,
 )
-from lookups import build_airline_mappers
-from sections.filters import render_filters
+from sections.filters import render_filters, render_year_filter
 from sections.kpis import render_kpis
 from sections.pies import render_pies
 from sections.lines import render_delay_lines
@@ -94,10 +95,17 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# -----------------------------
+# Year (year-partitioned cubes only)
+# -----------------------------
+dash_dir = get_dash_dir()
+years = list_cube_years(dash_dir)
+year = render_year_filter(years) if years else None
+
 # -----------------------------
 # Header
 # -----------------------------
-st.title("USA Flight Delay Dashboard (2024) ✈️")
+st.title(f"USA Flight Delay Dashboard ({year}) ✈️" if year is not None else "USA Flight Delay Dashboard ✈️")
 st.markdown(
     "<div style='font-size:20px; opacity:0.85; margin-top:-10px;'>by <b>Arik Ahnaf</b></div>",
     unsafe_allow_html=True,
@@ -110,26 +118,21 @@ st.markdown(
 # -----------------------------
 # Load data
 # -----------------------------
-dash_dir = get_dash_dir()
-ensure_files_exist(dash_dir)
+cube_dir = get_cube_dir(dash_dir, year)
+ensure_files_exist(cube_dir)
 
-core = load_core_table(dash_dir)
-routes = load_routes_table(dash_dir)
+core = load_core_table(cube_dir)
+routes = load_routes_table(cube_dir)
 
 # -----------------------------
 # Lookups (airline labels)
 # -----------------------------
-air_lu = load_airlines_lookup()
-# Save code->name for charts (donut legend)
-air_lu["operating_airline"] = air_lu["operating_airline"].astype(str).str.strip()
-air_lu["airline_name"] = air_lu["airline_name"].astype(str).str.strip()
-st.session_state["CODE_TO_NAME"] = dict(zip(air_lu["operating_airline"], air_lu["airline_name"]))
-_, airline_label, label_to_code = build_airline_mappers(air_lu)
+airlines = load_airline_mapper()
 
 # -----------------------------
 # Filters + filtered frames
 # -----------------------------
-core_f, routes_f = render_filters(core, routes, airline_label, label_to_code)
+core_f, routes_f = render_filters(core, routes, airlines.label, airlines.code)
 
 # -----------------------------
 # KPIs
@@ -1,13 +1,22 @@
 from pathlib import Path
+from typing import List, Optional
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
 
+from lookups import AirlineMapper, build_airline_mapper
+
 # Dashboard cube files required for the app to run
 REQUIRED_DASH_FILES = ["cube_core.csv", "cube_routes.csv"]
 
 # Lookup files
 REQUIRED_LOOKUP_FILES = ["airlines.csv"]
 
+# Cubes may also be written compressed (build_dashboard_tables.py --compression);
+# both codecs are decoded through pyarrow, as the scripts do, so no extra package is needed
+DASH_FILE_SUFFIXES = ["", ".gz", ".zst"]
+DASH_FILE_CODECS = {".gz": "gzip", ".zst": "zstd"}
+
 
 def get_repo_root() -> Path:
     return Path(__file__).resolve().parents[1]
@@ -21,8 +30,38 @@ def get_lookups_dir() -> Path:
     return get_repo_root() / "data" / "lookups"
 
 
+def list_cube_years(dash_dir: Path) -> List[int]:
+    # Year-partitioned cubes (build_dashboard_tables.py --by-year): dash_dir/year=YYYY/
+    years = []
+    for d in dash_dir.glob("year=*"):
+        if d.is_dir() and d.name.split("=", 1)[1].isdigit():
+            years.append(int(d.name.split("=", 1)[1]))
+    return sorted(years)
+
+
+def get_cube_dir(dash_dir: Path, year: Optional[int] = None) -> Path:
+    # Only the selected year's partition is ever read
+    return dash_dir if year is None else dash_dir / f"year={year}"
+
+
+def dash_file(dash_dir: Path, name: str) -> Path:
+    for suffix in DASH_FILE_SUFFIXES:
+        path = dash_dir / (name + suffix)
+        if path.exists():
+            return path
+    return dash_dir / name
+
+
+def read_dash_file(path: Path) -> pd.DataFrame:
+    codec = DASH_FILE_CODECS.get(path.suffix)
+    if codec is None:
+        return pd.read_csv(path)
+    with pa.input_stream(str(path), compression=codec) as f:
+        return pd.read_csv(f)
+
+
 def ensure_files_exist(dash_dir: Path) -> None:
-    missing_dash = [f for f in REQUIRED_DASH_FILES if not (dash_dir / f).exists()]
+    missing_dash = [f for f in REQUIRED_DASH_FILES if not dash_file(dash_dir, f).exists()]
     missing_lookup = [f for f in REQUIRED_LOOKUP_FILES if not (get_lookups_dir() / f).exists()]
 
     if missing_dash or missing_lookup:
@@ -32,8 +71,8 @@ def ensure_files_exist(dash_dir: Path) -> None:
             st.write("Missing dashboard files:", missing_dash)
             st.code(
                 "python scripts/build_dashboard_tables.py "
-                "--infile data/processed/flight_clean_data_2024.csv "
-                "--outdir data/processed/dashboard",
+                "--infile <clean CSV or Parquet dataset> "
+                "--outdir data/processed/dashboard --by-year",
                 language="bash",
             )
 
@@ -60,11 +99,17 @@ def load_airlines_lookup() -> pd.DataFrame:
     return df
 
 
+@st.cache_resource
+def load_airline_mapper() -> AirlineMapper:
+    # One mapper per process: reruns and sections share it instead of rebuilding code -> name maps
+    return build_airline_mapper(load_airlines_lookup())
+
+
 @st.cache_data
 def load_core_table(dash_dir: Path) -> pd.DataFrame:
-    return pd.read_csv(dash_dir / "cube_core.csv")
+    return read_dash_file(dash_file(dash_dir, "cube_core.csv"))
 
 
 @st.cache_data
 def load_routes_table(dash_dir: Path) -> pd.DataFrame:
-    return pd.read_csv(dash_dir / "cube_routes.csv")
+    return read_dash_file(dash_file(dash_dir, "cube_routes.csv"))
@@ -1,16 +1,41 @@
+import numpy as np
 import pandas as pd
-from typing import Callable, Dict, Tuple
+from typing import Dict
 
 
-def build_airline_mappers(
-    air_lu: pd.DataFrame,
-) -> Tuple[Dict[str, str], Callable[[str], str], Callable[[str], str]]:
+class AirlineMapper:
     """
-    Returns:
-      code_to_name: dict[code -> airline_name]
-      airline_label(code) -> "Airline Name" (falls back to code)
-      label_to_code(label) -> "CODE" (via reverse lookup; falls back to label)
+    Airline code <-> label mapping, built once per process (see
+    data_loader.load_airline_mapper).
+
+      label(code) -> "Airline Name" (code matched upper-cased; falls back to code)
+      code(label) -> "CODE" (via reverse lookup; falls back to label)
+      labels(codes: Series) -> Series of labels, mapped per distinct code
     """
+
+    def __init__(self, code_to_name: Dict[str, str], name_to_code: Dict[str, str]):
+        self.code_to_name = code_to_name
+        self.name_to_code = name_to_code
+
+    def label(self, code: str) -> str:
+        code = (code or "").strip()
+        return self.code_to_name.get(code.upper()) or code
+
+    def code(self, label: str) -> str:
+        label = (label or "").strip()
+        return self.name_to_code.get(label, label)
+
+    def labels(self, codes: pd.Series) -> pd.Series:
+        # Only the categories are normalized and looked up; rows take their category's label
+        cat = codes.astype("category")
+        keys = cat.cat.categories.astype(str).str.strip()
+        names = keys.str.upper().map(self.code_to_name).fillna("")
+        labels = np.where(names != "", names, keys).astype(object)
+        out = np.append(labels, "")[cat.cat.codes.to_numpy()]
+        return pd.Series(out, index=codes.index, dtype=object)
+
+
+def build_airline_mapper(air_lu: pd.DataFrame) -> AirlineMapper:
     df = air_lu.copy()
 
     # Validate expected columns
@@ -19,42 +44,19 @@ def build_airline_mappers(
     if missing:
         raise ValueError(f"airlines lookup missing columns: {sorted(missing)}")
 
-    # Clean & normalize
-    df["operating_airline"] = df["operating_airline"].astype(str).str.strip()
+    # Clean & normalize; "nan"/"None" strings become empty
+    df["operating_airline"] = df["operating_airline"].astype(str).str.strip().str.upper()
     df["airline_name"] = df["airline_name"].astype(str).str.strip()
-
-    # Turn "nan"/"None" strings into empty
-    df["airline_name"] = df["airline_name"].replace(
-        {"nan": "", "None": "", "none": "", "NaN": ""}
-    )
-
-    # Drop rows with no code
+    df.loc[df["airline_name"].isin(["nan", "None", "none", "NaN"]), "airline_name"] = ""
     df = df[df["operating_airline"].ne("")]
 
-    # Build maps (prefer non-empty names if duplicates exist)
-    code_to_name: Dict[str, str] = {}
-    for code, name in zip(df["operating_airline"], df["airline_name"]):
-        code = (code or "").strip()
-        name = (name or "").strip()
-        if not code:
-            continue
-        # If we already have a name, don't overwrite with blank
-        if code not in code_to_name or (not code_to_name[code] and name):
-            code_to_name[code] = name
-
-    # Reverse map: name -> code
-    name_to_code: Dict[str, str] = {}
-    for code, name in code_to_name.items():
-        if name and name not in name_to_code:
-            name_to_code[name] = code
-
-    def airline_label(code: str) -> str:
-        code = (code or "").strip()
-        name = (code_to_name.get(code) or "").strip()
-        return name if name else code
+    # One row per code, preferring a non-empty name if duplicates exist (first one wins otherwise)
+    df = df.sort_values("airline_name", key=lambda s: s.eq(""), kind="stable")
+    df = df.drop_duplicates("operating_airline").sort_index()
+    code_to_name = dict(zip(df["operating_airline"], df["airline_name"]))
 
-    def label_to_code(label: str) -> str:
-        label = (label or "").strip()
-        return name_to_code.get(label, label)
+    # Reverse map: name -> first code with that name
+    named = df[df["airline_name"].ne("")].drop_duplicates("airline_name")
+    name_to_code = dict(zip(named["airline_name"], named["operating_airline"]))
 
-    return code_to_name, airline_label, label_to_code
+    return AirlineMapper(code_to_name, name_to_code)
@@ -1,6 +1,8 @@
 import pandas as pd
 import streamlit as st
 
+from data_loader import load_airline_mapper
+
 def _safe_div(num: float, den: float) -> float:
     return (num / den) if den else 0.0
 
@@ -43,13 +45,7 @@ def _build_airline_scorecard(routes_f: pd.DataFrame) -> pd.DataFrame:
     agg = tmp.groupby("operating_airline", dropna=False).sum(numeric_only=True).reset_index()
     agg = agg.rename(columns={"operating_airline": "AirlineCode", "flights": "Flights"})
 
-    code_to_name = st.session_state.get("CODE_TO_NAME", {})
-
-    def _airline_name(code: str) -> str:
-        name = (code_to_name.get(code) or "").strip()
-        return name if name else code
-
-    agg["Airline"] = agg["AirlineCode"].apply(_airline_name)
+    agg["Airline"] = load_airline_mapper().labels(agg["AirlineCode"])
 
     # Percent columns
     agg["On-time %"] = agg.apply(lambda r: _pct(r["on_time_flights"], r["Flights"]), axis=1)
@@ -2,21 +2,12 @@ import pandas as pd
 import streamlit as st
 import plotly.express as px
 
+from data_loader import load_airline_mapper
+
 DEP_COLOR = "#B8860B"  # dark goldenrod
 ARR_COLOR = "#9B2C2C"  # dark red
 
 
-def _airline_name_only(code: str) -> str:
-    """
-    Map airline code -> airline NAME only (no "(AA)" code).
-    Falls back to the code if name is missing.
-    """
-    code = (code or "").strip().upper()
-    code_to_name = st.session_state.get("CODE_TO_NAME", {})
-    name = (code_to_name.get(code) or "").strip()
-    return name if name else code
-
-
 def _agg_airline(routes_f: pd.DataFrame, col: str, top_n: int = 12) -> pd.DataFrame:
     """
     Aggregate delayed counts by airline code.
@@ -54,7 +45,8 @@ def _agg_airline(routes_f: pd.DataFrame, col: str, top_n: int = 12) -> pd.DataFr
             )
         agg = top
 
-    agg["AirlineName"] = agg["AirlineCode"].apply(_airline_name_only)
+    # Airline NAME only (no "(AA)" code); falls back to the code if name is missing
+    agg["AirlineName"] = load_airline_mapper().labels(agg["AirlineCode"])
 
     # Ensure the "Other" label is clean
     agg.loc[agg["AirlineCode"].str.upper().eq("OTHER"), "AirlineName"] = "Other"
@@ -1,6 +1,27 @@
 import streamlit as st
 import pandas as pd
-from typing import Callable, Tuple
+from typing import Callable, List, Tuple
+
+# Per-year filter state; cleared when the year changes since options differ by year
+FILTER_STATE_KEYS = ["f_months", "f_airlines", "f_origin_states", "f_dest_states", "f_causes"]
+
+
+def render_year_filter(years: List[int]) -> int:
+    # Pick one year; the app then loads only that year's cube partition
+    def _clear():
+        for key in FILTER_STATE_KEYS:
+            st.session_state.pop(key, None)
+
+    if "f_year" not in st.session_state or st.session_state["f_year"] not in years:
+        st.session_state["f_year"] = years[-1]
+
+    st.sidebar.selectbox(
+        "Year",
+        options=years,
+        key="f_year",
+        on_change=_clear,
+    )
+    return st.session_state["f_year"]
 
 
 def render_filters(
@@ -3,6 +3,8 @@ import streamlit as st
 import plotly.express as px
 import hashlib
 
+from data_loader import load_airline_mapper
+
 
 def render_pies(routes_f: pd.DataFrame) -> None:
     """
@@ -209,13 +211,7 @@ def render_pies(routes_f: pd.DataFrame) -> None:
                                         ignore_index=True)
                     agg = top
 
-                code_to_name = st.session_state.get("CODE_TO_NAME", {})
-
-                def _airline_name(code: str) -> str:
-                    name = (code_to_name.get(code) or "").strip()
-                    return name if name else code
-
-                agg["AirlineName"] = agg["Airline"].apply(_airline_name)
+                agg["AirlineName"] = load_airline_mapper().labels(agg["Airline"])
 
                 dark_vivid_palette = [
                     "#2E7D32",  # deep green
@@ -0,0 +1,110 @@
+import argparse
+import time
+from pathlib import Path
+import pandas as pd
+
+from dashboard_agg.aggregations import agg_metrics, chunk_metrics
+from dashboard_agg.constants import METRIC_COLS
+from dashboard_agg.pipeline import CUBE_KEYS, DERIVED_CUBES, cube_frames, update_tables
+from dashboard_agg.rollup import rollup_cubes
+from dashboard_agg.schema import CLEAN_DTYPES, TABLES_COLS
+from dashboard_agg.transforms import ensure_columns
+from process_flight_data_in_chunks import process_chunk
+
+# Reference implementation: every cube copied the chunk and derived the flags again
+
+def legacy_agg_metrics(chunk: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    tmp = chunk.copy()
+    tmp["flights"] = 1
+
+    tmp["cancelled_flights"] = (tmp["is_cancelled"] == 1).astype(int)
+    tmp["on_time_flights"] = ((tmp["arrival_delay_min"] == 0) & (tmp["is_cancelled"] == 0)).astype(int)
+
+    tmp["dep_delayed_any"] = (tmp["departure_delay_min"] > 0).astype(int)
+    tmp["dep_delayed_15"]  = (tmp["departure_delay_min"] >= 15).astype(int)
+    tmp["dep_delayed_30"]  = (tmp["departure_delay_min"] >= 30).astype(int)
+    tmp["dep_delayed_60"]  = (tmp["departure_delay_min"] >= 60).astype(int)
+    tmp["dep_delayed_120"] = (tmp["departure_delay_min"] >= 120).astype(int)
+
+    tmp["arr_delayed_any"] = (tmp["arrival_delay_min"] > 0).astype(int)
+    tmp["arr_delayed_15"]  = (tmp["arrival_delay_min"] >= 15).astype(int)
+    tmp["arr_delayed_30"]  = (tmp["arrival_delay_min"] >= 30).astype(int)
+    tmp["arr_delayed_60"]  = (tmp["arrival_delay_min"] >= 60).astype(int)
+    tmp["arr_delayed_120"] = (tmp["arrival_delay_min"] >= 120).astype(int)
+
+    tmp["sum_departure_delay_min"] = tmp["departure_delay_min"].astype("float64")
+    tmp["sum_arrival_delay_min"] = tmp["arrival_delay_min"].astype("float64")
+    tmp["sum_total_delay_min"] = tmp["total_delay_min"].astype("float64")
+
+    out = tmp.groupby(keys, dropna=False, observed=True)[METRIC_COLS].sum().reset_index()
+    for k in keys:
+        if isinstance(out[k].dtype, pd.CategoricalDtype):
+            out[k] = out[k].astype(out[k].cat.categories.dtype)
+    return out
+
+
+def legacy_cubes(chunk: pd.DataFrame) -> dict:
+    return {name: legacy_agg_metrics(chunk, keys) for name, keys in CUBE_KEYS.items()}
+
+
+def shared_cubes(chunk: pd.DataFrame) -> dict:
+    metrics = chunk_metrics(chunk)
+    return {name: agg_metrics(chunk, keys, metrics) for name, keys in CUBE_KEYS.items()}
+
+
+def accumulated_cubes(chunk: pd.DataFrame) -> dict:
+    # What hash aggregation runs per chunk: update_tables into fresh CubeAccumulators
+    accs = {}
+    update_tables(accs, chunk)
+    return accs
+
+
+def _best_of(fn, repeat: int):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-chunk cost of aggregating one cleaned chunk into every cube")
+    ap.add_argument("--raw", default="data/raw/flight_data_2024_sample.csv", help="Raw CSV to benchmark on")
+    ap.add_argument("--scale", type=int, default=50, help="Tile the input this many times (one chunk)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    raw = pd.read_csv(Path(args.raw), low_memory=False)
+    raw = pd.concat([raw] * args.scale, ignore_index=True)
+    # Cleaned columns with the dtypes build_tables reads them with
+    clean = process_chunk(raw)[TABLES_COLS]
+    chunk = ensure_columns(clean.astype({c: t for c, t in CLEAN_DTYPES.items() if c in clean.columns}))
+    rows = len(chunk)
+    print(f"Chunk: {rows:,} rows, {len(CUBE_KEYS)} cubes")
+
+    t_old, old = _best_of(lambda: legacy_cubes(chunk), args.repeat)
+    t_new, new = _best_of(lambda: shared_cubes(chunk), args.repeat)
+    for name in CUBE_KEYS:
+        pd.testing.assert_frame_equal(old[name], new[name], obj=f"cube {name}")
+
+    # update_tables only aggregates the materialized cubes; the rest are rolled up when written
+    t_acc, accs = _best_of(lambda: accumulated_cubes(chunk), args.repeat)
+    cubes = rollup_cubes(cube_frames(accs), CUBE_KEYS, DERIVED_CUBES)
+    for name, keys in CUBE_KEYS.items():
+        expected = old[name].set_index(keys)[METRIC_COLS].astype("float64").sort_index()
+        pd.testing.assert_frame_equal(expected, cubes[name], check_index_type=False, obj=f"cube {name}")
+
+    print(f"{'copy + flags per cube':<24} {t_old * 1000:9.1f} ms/chunk {rows / t_old:>14,.0f} rows/s")
+    print(f"{'flags once, shared':<24} {t_new * 1000:9.1f} ms/chunk {rows / t_new:>14,.0f} rows/s   x{t_old / t_new:,.1f}"
+          "   (agg_metrics)")
+    print(f"{'update_tables':<24} {t_acc * 1000:9.1f} ms/chunk {rows / t_acc:>14,.0f} rows/s   x{t_old / t_acc:,.1f}"
+          "   (CubeAccumulator, build_tables path)")
+
+    t_flags, _ = _best_of(lambda: chunk_metrics(chunk), args.repeat)
+    print(f"{'  of which chunk_metrics':<24} {t_flags * 1000:9.1f} ms/chunk")
+
+
+if __name__ == "__main__":
+    main()
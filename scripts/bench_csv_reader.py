@@ -0,0 +1,43 @@
+import argparse
+import time
+from pathlib import Path
+
+from dashboard_agg.schema import CLEAN_DTYPES, ETL_RAW_COLS, RAW_DTYPES, TABLES_COLS
+from dashboard_agg.storage import CSV_READERS, iter_csv_chunks
+
+
+def _parse_time(path: Path, chunksize: int, columns, dtypes, reader: str, repeat: int):
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = sum(len(chunk) for chunk in iter_csv_chunks(path, chunksize, columns, dtypes, reader=reader))
+        best = min(best, time.perf_counter() - t0)
+    return best, rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--raw", default="data/raw/flight_data_2024.csv", help="Raw CSV (ETL read)")
+    ap.add_argument("--clean", default=None, help="Optional clean CSV (build_tables read)")
+    ap.add_argument("--chunksize", type=int, default=500_000)
+    ap.add_argument("--repeat", type=int, default=1)
+    args = ap.parse_args()
+
+    cases = [("ETL raw read", Path(args.raw), ETL_RAW_COLS, RAW_DTYPES)]
+    if args.clean:
+        cases.append(("build_tables clean read", Path(args.clean), TABLES_COLS, CLEAN_DTYPES))
+
+    for name, path, columns, dtypes in cases:
+        size_mb = path.stat().st_size / 1e6
+        print(f"{name}: {path} ({size_mb:,.1f} MB)")
+        times = {}
+        for reader in CSV_READERS:
+            t, rows = _parse_time(path, args.chunksize, columns, dtypes, reader, args.repeat)
+            times[reader] = t
+            print(f"  {reader:<8} {t:8.2f}s  {rows / t:>14,.0f} rows/s  {size_mb / t:8.1f} MB/s")
+        print(f"  speedup  x{times['pandas'] / times['pyarrow']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import time
+from pathlib import Path
+import pandas as pd
+import numpy as np
+
+from process_flight_data_in_chunks import (
+    CAUSE_LABELS,
+    hhmm_to_hour_min,
+    hhmm_to_int,
+    hhmm_int_to_label,
+    primary_cause,
+    process_chunk,
+)
+
+# Reference (row-wise) implementations the vectorized kernel replaced
+
+def legacy_hhmm_to_hour_min(series: pd.Series):
+    s = series.apply(lambda x: np.nan if pd.isna(x) else str(int(float(x))).zfill(4))
+    hour = s.apply(lambda x: np.nan if pd.isna(x) else int(x[:2])).astype("Int64")
+    minute = s.apply(lambda x: np.nan if pd.isna(x) else int(x[2:])).astype("Int64")
+    return hour, minute
+
+def legacy_departure_time(series: pd.Series) -> list:
+    h, m = legacy_hhmm_to_hour_min(series)
+    return [
+        np.nan if pd.isna(hh) or pd.isna(mm) else f"{int(hh):02d}:{int(mm):02d}"
+        for hh, mm in zip(h.tolist(), m.tolist())
+    ]
+
+def legacy_primary_cause(chunk: pd.DataFrame, cause_cols: list[str], total: pd.Series) -> np.ndarray:
+    max_cause = chunk[cause_cols].idxmax(axis=1)
+    return np.where(total > 0, max_cause.map(CAUSE_LABELS), "No Delay")
+
+
+def _best_of(fn, repeat: int):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def _report(name: str, rows: int, t_old: float, t_new: float) -> None:
+    print(
+        f"{name:<26} legacy {rows / t_old:>14,.0f} rows/s   "
+        f"vectorized {rows / t_new:>14,.0f} rows/s   x{t_old / t_new:,.1f}"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--raw", default="data/raw/flight_data_2024_sample.csv", help="Raw CSV to benchmark on")
+    ap.add_argument("--scale", type=int, default=20, help="Tile the input this many times")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    raw = pd.read_csv(Path(args.raw), low_memory=False)
+    raw = pd.concat([raw] * args.scale, ignore_index=True)
+    rows = len(raw)
+    print(f"Rows: {rows:,}")
+
+    hhmm = raw["crs_dep_time"]
+
+    t_old, (h_old, m_old) = _best_of(lambda: legacy_hhmm_to_hour_min(hhmm), args.repeat)
+    t_new, (h_new, m_new) = _best_of(lambda: hhmm_to_hour_min(hhmm), args.repeat)
+    pd.testing.assert_series_equal(h_old, h_new, check_names=False)
+    pd.testing.assert_series_equal(m_old, m_new, check_names=False)
+    _report("hhmm_to_hour_min", rows, t_old, t_new)
+
+    t_old, lbl_old = _best_of(lambda: legacy_departure_time(hhmm), args.repeat)
+    t_new, lbl_new = _best_of(lambda: hhmm_int_to_label(hhmm_to_int(hhmm)), args.repeat)
+    pd.testing.assert_series_equal(
+        pd.Series(lbl_old, dtype=object), lbl_new.astype(object), check_names=False
+    )
+    _report("scheduled_departure_time", rows, t_old, t_new)
+
+    causes = raw.rename(columns={c.removesuffix("_min"): c for c in CAUSE_LABELS})
+    cause_cols = list(CAUSE_LABELS)
+    causes[cause_cols] = causes[cause_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
+    total = causes[cause_cols].sum(axis=1)
+
+    t_old, pc_old = _best_of(lambda: legacy_primary_cause(causes, cause_cols, total), args.repeat)
+    t_new, pc_new = _best_of(lambda: primary_cause(causes, cause_cols, total), args.repeat)
+    assert np.array_equal(pc_old.astype(str), pc_new.astype(str)), "primary_delay_cause mismatch"
+    _report("primary_delay_cause", rows, t_old, t_new)
+
+    t_chunk, _ = _best_of(lambda: process_chunk(raw.copy()), args.repeat)
+    print(f"{'process_chunk (total)':<26} {rows / t_chunk:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
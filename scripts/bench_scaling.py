@@ -0,0 +1,89 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from generate_synthetic_flights import generate
+
+SCRIPTS = Path(__file__).resolve().parent
+
+
+def run_step(name: str, cmd: list, profile: Path) -> dict:
+    # Each step runs in its own process so its peak RSS is measured on its own
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, *cmd, "--profile", str(profile)], check=True, stdout=subprocess.DEVNULL)
+    seconds = time.perf_counter() - t0
+    with open(profile) as f:
+        report = json.load(f)
+    return {"step": name, "seconds": seconds, "peak_rss_bytes": report["peak_rss_bytes"], "stages": report["stages"]}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="ETL, lookups and cube build on synthetic data at growing scales")
+    ap.add_argument("--workdir", default="data/bench", help="Where synthetic inputs and outputs are written")
+    ap.add_argument("--base-rows", type=int, default=100_000, help="Rows at scale 1x")
+    ap.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    ap.add_argument("--chunksize", type=int, default=500_000)
+    ap.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Clean dataset format")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--report", default=None, help="JSON file for the throughput/memory curves")
+    ap.add_argument("--keep", action="store_true", help="Keep the generated raw files (cleaned data, lookups, cubes and profiles are always kept)")
+    args = ap.parse_args()
+
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    chunk = ["--chunksize", str(args.chunksize)]
+
+    results = []
+    for scale in args.scales:
+        rows = int(args.base_rows * scale)
+        tag = f"x{scale:g}"
+        raw = generate(
+            SCRIPTS.parent / "data/raw/flight_data_2024_sample.csv",
+            SCRIPTS.parent / "data/raw/flight_data_2024_data_dictionary.csv",
+            workdir / f"raw_{tag}.csv",
+            rows,
+            seed=args.seed,
+        )
+        clean = workdir / (f"clean_{tag}" if args.format == "parquet" else f"clean_{tag}.csv")
+        steps = [
+            ("etl", [str(SCRIPTS / "process_flight_data_in_chunks.py"), "--raw", str(raw), "--out", str(clean),
+                     "--format", args.format, *chunk]),
+            ("lookups", [str(SCRIPTS / "build_lookups.py"), "--clean", str(clean),
+                         "--outdir", str(workdir / f"lookups_{tag}"), *chunk]),
+            ("cubes", [str(SCRIPTS / "build_dashboard_tables.py"), "--infile", str(clean),
+                       "--outdir", str(workdir / f"dashboard_{tag}"), *chunk]),
+        ]
+        for name, cmd in steps:
+            r = run_step(name, cmd, workdir / f"profile_{name}_{tag}.json")
+            r.update(scale=scale, rows=rows, rows_per_sec=rows / r["seconds"])
+            results.append(r)
+            print(
+                f"{tag:>6} {name:<8} {rows:>12,} rows {r['seconds']:8.2f}s "
+                f"{r['rows_per_sec']:>12,.0f} rows/s  peak {r['peak_rss_bytes'] / 2**20:8.1f} MB"
+            )
+
+        if not args.keep:
+            raw.unlink()
+
+    # Scaling relative to the smallest scale: time should grow ~linearly, memory should stay flat
+    print("\nstep     scale   time x    rows/s x   peak RSS x")
+    for name in ["etl", "lookups", "cubes"]:
+        rs = [r for r in results if r["step"] == name]
+        first = rs[0]
+        for r in rs:
+            print(
+                f"{name:<8} {r['scale']:>5g} {r['seconds'] / first['seconds']:>8.2f} "
+                f"{r['rows_per_sec'] / first['rows_per_sec']:>11.2f} {r['peak_rss_bytes'] / first['peak_rss_bytes']:>12.2f}"
+            )
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"argv": sys.argv, "results": results}, f, indent=2)
+        print(f"Wrote: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,52 @@
 import argparse
 from pathlib import Path
+from dashboard_agg.compression import OUTPUT_COMPRESSIONS, report_io_savings
+from dashboard_agg.memory import parse_size, report_peak_rss
 from dashboard_agg.pipeline import build_tables
+from dashboard_agg.profiling import DISABLED, Profiler
+from dashboard_agg.storage import CSV_READERS
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--infile", required=True)
+    ap.add_argument("--infile", required=True, help="Clean CSV or partitioned Parquet dataset")
     ap.add_argument("--outdir", default="data/processed/dashboard")
     ap.add_argument("--chunksize", type=int, default=500_000)
+    ap.add_argument("--memory-budget", type=parse_size, default=None,
+                    help="Adapt the chunk size to stay under this much memory (e.g. 2G); overrides --chunksize")
     ap.add_argument("--top_airports", type=int, default=150)
+    ap.add_argument("--months", type=int, nargs="+", default=None, help="Only aggregate these months (1-12)")
+    ap.add_argument("--years", type=int, nargs="+", default=None,
+                    help="Only aggregate these years (Parquet input: other year partitions are not opened; the input needs a year column)")
+    ap.add_argument("--by-year", action="store_true",
+                    help="Write one cube set per year under <outdir>/year=YYYY/")
+    ap.add_argument("--reader", choices=CSV_READERS, default="pandas", help="CSV parser backend for a CSV --infile")
+    ap.add_argument("--compression", choices=list(OUTPUT_COMPRESSIONS), default="none",
+                    help="Write the cubes as cube_*.csv.gz / cube_*.csv.zst")
+    ap.add_argument("--profile", default=None, metavar="REPORT.json",
+                    help="Record time, rows/s and peak memory per stage and chunk into this JSON report")
     args = ap.parse_args()
+    prof = Profiler("build_dashboard_tables") if args.profile else DISABLED
 
     build_tables(
         infile=Path(args.infile),
         outdir=Path(args.outdir),
         chunksize=args.chunksize,
         top_airports=args.top_airports,
+        months=args.months,
+        reader=args.reader,
+        memory_budget=args.memory_budget,
+        compression=args.compression,
+        prof=prof,
+        years=args.years,
+        by_year=args.by_year,
     )
 
     print(f"Done. Wrote dashboard tables to: {args.outdir}")
+    report_io_savings()
+    if args.profile:
+        prof.write(Path(args.profile), config=vars(args))
+    if args.memory_budget is not None:
+        report_peak_rss()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,50 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def load(path: Path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare two --profile reports stage by stage")
+    ap.add_argument("baseline", help="Profile JSON of the reference run")
+    ap.add_argument("candidate", help="Profile JSON of the run to check")
+    ap.add_argument("--threshold", type=float, default=0.10,
+                    help="Flag stages whose time grew by more than this fraction (default 0.10)")
+    ap.add_argument("--min-seconds", type=float, default=0.05,
+                    help="Ignore stages faster than this in both runs")
+    args = ap.parse_args()
+
+    base, cand = load(Path(args.baseline)), load(Path(args.candidate))
+    print(f"{'stage':<24} {'baseline':>10} {'candidate':>10} {'change':>8}")
+
+    slower = []
+    for name in list(base["stages"]) + [n for n in cand["stages"] if n not in base["stages"]]:
+        b = base["stages"].get(name, {}).get("seconds")
+        c = cand["stages"].get(name, {}).get("seconds")
+        if b is None or c is None:
+            fmt = lambda t: f"{t:.3f}s" if t is not None else "-"
+            print(f"{name:<24} {fmt(b):>10} {fmt(c):>10}")
+            continue
+        change = (c - b) / b if b else 0.0
+        flag = ""
+        if change > args.threshold and max(b, c) >= args.min_seconds:
+            slower.append(name)
+            flag = "  SLOWER"
+        print(f"{name:<24} {b:>9.3f}s {c:>9.3f}s {change:>+7.1%}{flag}")
+
+    tb, tc = base["total_seconds"], cand["total_seconds"]
+    print(f"{'total':<24} {tb:>9.3f}s {tc:>9.3f}s {(tc - tb) / tb:>+7.1%}")
+    print(f"{'peak RSS (MB)':<24} {base['peak_rss_bytes'] / 2**20:>10.1f} {cand['peak_rss_bytes'] / 2**20:>10.1f}")
+
+    if slower:
+        print(f"{len(slower)} stage(s) slower by more than {args.threshold:.0%}: {', '.join(slower)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
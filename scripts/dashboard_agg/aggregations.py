@@ -1,38 +1,196 @@
 import numpy as np
 import pandas as pd
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from .constants import METRIC_COLS
 
-def agg_metrics(chunk: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
-    tmp = chunk.copy()
-    tmp["flights"] = 1
+# Delay thresholds (minutes) of the *_delayed_<n> flags
+DELAY_THRESHOLDS = [15, 30, 60, 120]
 
-    tmp["cancelled_flights"] = (tmp["is_cancelled"] == 1).astype(int)
-    tmp["on_time_flights"] = ((tmp["arrival_delay_min"] == 0) & (tmp["is_cancelled"] == 0)).astype(int)
+# Flag counts (bool per row) and delay sums (float64 per row) among METRIC_COLS
+COUNT_COLS = [c for c in METRIC_COLS if not c.startswith("sum_")]
+SUM_COLS = [c for c in METRIC_COLS if c.startswith("sum_")]
 
-    tmp["dep_delayed_any"] = (tmp["departure_delay_min"] > 0).astype(int)
-    tmp["dep_delayed_15"]  = (tmp["departure_delay_min"] >= 15).astype(int)
-    tmp["dep_delayed_30"]  = (tmp["departure_delay_min"] >= 30).astype(int)
-    tmp["dep_delayed_60"]  = (tmp["departure_delay_min"] >= 60).astype(int)
-    tmp["dep_delayed_120"] = (tmp["departure_delay_min"] >= 120).astype(int)
+def _values(chunk: pd.DataFrame, col: str) -> np.ndarray:
+    return chunk[col].to_numpy(dtype="float64", na_value=np.nan)
 
-    tmp["arr_delayed_any"] = (tmp["arrival_delay_min"] > 0).astype(int)
-    tmp["arr_delayed_15"]  = (tmp["arrival_delay_min"] >= 15).astype(int)
-    tmp["arr_delayed_30"]  = (tmp["arrival_delay_min"] >= 30).astype(int)
-    tmp["arr_delayed_60"]  = (tmp["arrival_delay_min"] >= 60).astype(int)
-    tmp["arr_delayed_120"] = (tmp["arrival_delay_min"] >= 120).astype(int)
+def chunk_metrics(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    The METRIC_COLS of one chunk, row by row, without copying the chunk:
+    flags are bool (summed as int64 counts), delay sums float64. Computed
+    once per chunk and shared by every cube's agg_metrics/CubeAccumulator.
+    """
+    dep = _values(chunk, "departure_delay_min")
+    arr = _values(chunk, "arrival_delay_min")
+    cancelled = _values(chunk, "is_cancelled")
 
-    tmp["sum_departure_delay_min"] = tmp["departure_delay_min"]
-    tmp["sum_arrival_delay_min"] = tmp["arrival_delay_min"]
-    tmp["sum_total_delay_min"] = tmp["total_delay_min"]
+    m = {
+        "flights": np.ones(len(chunk), dtype=bool),
+        "cancelled_flights": cancelled == 1,
+        "on_time_flights": (arr == 0) & (cancelled == 0),
+        "dep_delayed_any": dep > 0,
+    }
+    m.update({f"dep_delayed_{t}": dep >= t for t in DELAY_THRESHOLDS})
+    m["arr_delayed_any"] = arr > 0
+    m.update({f"arr_delayed_{t}": arr >= t for t in DELAY_THRESHOLDS})
+    # Rows may be float32; sum in float64 so yearly totals stay exact. Missing delays
+    # add nothing, as in a pandas sum
+    m["sum_departure_delay_min"] = np.nan_to_num(dep, nan=0.0)
+    m["sum_arrival_delay_min"] = np.nan_to_num(arr, nan=0.0)
+    m["sum_total_delay_min"] = np.nan_to_num(_values(chunk, "total_delay_min"), nan=0.0)
+    return pd.DataFrame({c: m[c] for c in METRIC_COLS}, index=chunk.index)
 
-    return tmp.groupby(keys, dropna=False)[METRIC_COLS].sum().reset_index()
+def agg_metrics(chunk: pd.DataFrame, keys: list[str], metrics: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    # metrics: chunk_metrics(chunk), when several cubes are built from the same chunk
+    if metrics is None:
+        metrics = chunk_metrics(chunk)
+    out = metrics.groupby([chunk[k] for k in keys], dropna=False, observed=True).sum().reset_index()
 
-def accumulate(acc: Optional[pd.DataFrame], g: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
-    g_idx = g.set_index(keys)[METRIC_COLS]
-    if acc is None:
-        return g_idx
-    return acc.add(g_idx, fill_value=0)
+    # Categorical keys back to plain values so results of chunks with different categories line up
+    for k in keys:
+        if isinstance(out[k].dtype, pd.CategoricalDtype):
+            out[k] = out[k].astype(out[k].cat.categories.dtype)
+    return out
+
+KeyCodes = Dict[str, Tuple[np.ndarray, pd.Index]]
+
+def factorize_keys(chunk: pd.DataFrame, cols: list[str]) -> KeyCodes:
+    """
+    Per key column, an int code per row and the distinct values the codes
+    index (missing values included as a value). Done once per chunk and
+    shared by every cube that groups by the column.
+    """
+    out: KeyCodes = {}
+    for col in cols:
+        s = chunk[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes, uniques = s.cat.codes.to_numpy(), s.cat.categories
+            if (codes < 0).any():
+                codes = np.where(codes < 0, len(uniques), codes)
+                uniques = uniques.insert(len(uniques), np.nan)
+        else:
+            codes, uniques = pd.factorize(s, use_na_sentinel=False)
+            uniques = pd.Index(uniques)
+        out[col] = (codes, uniques)
+    return out
+
+class CubeAccumulator:
+    """
+    Running METRIC_COLS sums of one cube, replacing a frame re-aligned with
+    DataFrame.add per chunk. Every key column is dictionary-encoded into
+    ints (values in first-seen order), the key codes are packed into one
+    int64 per row (a bit field per key, widened as dictionaries grow), and
+    each chunk's rows are summed per packed code with np.bincount into
+    int64 counts and float64 sums indexed by group id. Only to_frame()
+    builds a DataFrame.
+    """
+
+    def __init__(self, keys: list[str]):
+        self.keys = keys
+        self._values: Dict[str, pd.Index] = {}
+        self._bits = np.zeros(len(keys), dtype=np.int64)
+        self._n = 0
+        self._codes = np.zeros((0, len(keys)), dtype=np.int64)
+        self._counts = np.zeros((0, len(COUNT_COLS)), dtype=np.int64)
+        self._sums = np.zeros((0, len(SUM_COLS)), dtype=np.float64)
+        # Packed code of every group, sorted, and the group id of each
+        self._packed = np.zeros(0, dtype=np.int64)
+        self._ids = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _shifts(self) -> np.ndarray:
+        return np.concatenate([[0], np.cumsum(self._bits)[:-1]])
+
+    def _pack(self, codes: np.ndarray) -> np.ndarray:
+        return np.bitwise_or.reduce(codes << self._shifts(), axis=1)
+
+    def _unpack(self, packed: np.ndarray) -> np.ndarray:
+        return (packed[:, None] >> self._shifts()) & ((1 << self._bits) - 1)
+
+    def _encode(self, key_codes: KeyCodes) -> np.ndarray:
+        # Row codes into this cube's dictionaries, one column per key
+        cols = []
+        for j, k in enumerate(self.keys):
+            codes, uniques = key_codes[k]
+            known = self._values.get(k, uniques[:0])
+            ids = known.get_indexer(uniques)
+            new = ids < 0
+            if new.any():
+                ids[new] = len(known) + np.arange(int(new.sum()))
+                known = known.append(uniques[new])
+            self._values[k] = known
+            cols.append(ids[codes])
+
+        bits = np.array([max(1, (len(self._values[k]) - 1).bit_length()) for k in self.keys])
+        if (bits > self._bits).any():
+            # Wider fields: re-pack the groups seen so far
+            self._bits = np.maximum(bits, self._bits)
+            if self._bits.sum() > 62:
+                raise ValueError(f"too many distinct keys to pack {self.keys} into 64 bits")
+            packed = self._pack(self._codes[:self._n])
+            self._ids = np.argsort(packed)
+            self._packed = packed[self._ids]
+        return np.column_stack(cols).astype(np.int64, copy=False)
+
+    def _group_ids(self, packed: np.ndarray) -> np.ndarray:
+        # Ids of the chunk's distinct packed codes; unseen ones become new groups
+        pos = np.searchsorted(self._packed, packed)
+        found = pos < len(self._packed)
+        found[found] = self._packed[pos[found]] == packed[found]
+        ids = np.empty(len(packed), dtype=np.int64)
+        ids[found] = self._ids[pos[found]]
+
+        new = np.flatnonzero(~found)
+        if len(new):
+            start, self._n = self._n, self._n + len(new)
+            ids[new] = start + np.arange(len(new))
+            self._grow(self._n)
+            self._codes[start:self._n] = self._unpack(packed[new])
+            order = np.argsort(packed[new])
+            at = pos[new][order]
+            self._packed = np.insert(self._packed, at, packed[new][order])
+            self._ids = np.insert(self._ids, at, ids[new][order])
+        return ids
+
+    def _grow(self, n: int) -> None:
+        if n <= len(self._codes):
+            return
+        cap = max(n, 2 * len(self._codes))
+        for name in ["_codes", "_counts", "_sums"]:
+            old = getattr(self, name)
+            grown = np.zeros((cap, old.shape[1]), dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def add(self, key_codes: KeyCodes, metrics: pd.DataFrame) -> None:
+        """
+        Fold one chunk in: key_codes from factorize_keys, metrics from
+        chunk_metrics (same rows).
+        """
+        if not len(metrics):
+            return
+        row_group, packed = pd.factorize(self._pack(self._encode(key_codes)))
+        ids = self._group_ids(packed)
+
+        n = len(packed)
+        for i, c in enumerate(COUNT_COLS):
+            self._counts[ids, i] += np.bincount(row_group[metrics[c].to_numpy()], minlength=n)
+        for i, c in enumerate(SUM_COLS):
+            self._sums[ids, i] += np.bincount(row_group, weights=metrics[c].to_numpy(), minlength=n)
+
+    def to_frame(self) -> pd.DataFrame:
+        # Indexed by the keys in groupby order, float64 sums
+        n = self._n
+        levels = [self._values[k].take(self._codes[:n, j]) if n else pd.Index([]) for j, k in enumerate(self.keys)]
+        if len(self.keys) == 1:
+            index = pd.Index(levels[0], name=self.keys[0])
+        else:
+            index = pd.MultiIndex.from_arrays(levels, names=self.keys)
+        data = {c: self._counts[:n, i] for i, c in enumerate(COUNT_COLS)}
+        data.update({c: self._sums[:n, i] for i, c in enumerate(SUM_COLS)})
+        out = pd.DataFrame(data, index=index)[METRIC_COLS].astype("float64")
+        return out.sort_index()
 
 def finalize(acc_idx: pd.DataFrame) -> pd.DataFrame:
     out = acc_idx.reset_index()
@@ -0,0 +1,69 @@
+import json
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Fields that must match for a run to resume from an existing manifest
+RESUME_KEYS = ["raw", "raw_size", "raw_mtime", "format", "chunksize", "columns"]
+
+
+def manifest_path(out_path: Path) -> Path:
+    return out_path.with_name(out_path.name + ".manifest.json")
+
+
+def new_manifest(raw_path: Path, out_path: Path, fmt: str, chunksize: int, columns: str = "default") -> dict:
+    st = raw_path.stat()
+    return {
+        "raw": str(raw_path.resolve()),
+        "raw_size": st.st_size,
+        "raw_mtime": st.st_mtime,
+        "out": str(out_path),
+        "format": fmt,
+        "chunksize": chunksize,
+        "columns": columns,
+        "chunks": [],
+        "complete": False,
+    }
+
+
+def load_manifest(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(path: Path, manifest: dict) -> None:
+    # Write-then-rename so a crash never leaves a half-written manifest behind
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def check_resumable(manifest: dict, expected: dict) -> None:
+    # Manifests written before column profiles existed used the default profile
+    changed = [k for k in RESUME_KEYS if manifest.get(k, "default" if k == "columns" else None) != expected.get(k)]
+    if changed:
+        raise ValueError(f"cannot resume: {changed} differ from the checkpoint manifest; rerun without --resume")
+
+
+def record_chunk(manifest: dict, index: int, rows_out: int, raw_offset: int, out_bytes: int) -> None:
+    manifest["chunks"].append({
+        "index": index,
+        "rows_out": rows_out,
+        "raw_offset": raw_offset,
+        "out_bytes": out_bytes,
+    })
+
+
+def resume_point(manifest: dict) -> Tuple[int, int, int]:
+    """
+    Returns (next chunk index, raw byte offset to seek to, committed output bytes).
+    """
+    if not manifest["chunks"]:
+        return 0, 0, 0
+    last = manifest["chunks"][-1]
+    return last["index"] + 1, last["raw_offset"], last["out_bytes"]
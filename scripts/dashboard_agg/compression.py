@@ -0,0 +1,239 @@
+import io
+import os
+import queue
+import threading
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .memory import format_bytes
+
+# Raw/clean input suffix -> codec (a .zip may hold several CSV members, e.g. one per month)
+INPUT_COMPRESSIONS = {".gz": "gzip", ".zst": "zstd", ".zip": "zip"}
+
+# --compression choice -> suffix appended to CSV outputs
+OUTPUT_COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+# --compression choice -> Parquet codec (snappy stays the default)
+PARQUET_COMPRESSIONS = {"none": "snappy", "gzip": "gzip", "zstd": "zstd"}
+
+PIECE_SIZE = 4 << 20
+PREFETCH_PIECES = 4
+
+# Bytes on disk vs. plain CSV bytes for every compressed file read or written
+IO_STATS = {"read_stored": 0, "read_plain": 0, "write_stored": 0, "write_plain": 0}
+
+
+def compression_of(path: Path) -> Optional[str]:
+    return INPUT_COMPRESSIONS.get(path.suffix.lower())
+
+
+def raw_stem(path: Path) -> str:
+    # Name without the raw-file suffixes: ontime.2024.h1.csv.gz -> ontime.2024.h1, jan.zip -> jan
+    name = path.name
+    for suffix in [*INPUT_COMPRESSIONS, ".csv"]:
+        if name.lower().endswith(suffix):
+            name = name[: -len(suffix)]
+    return name
+
+
+def csv_name(stem: str, compression: str = "none") -> str:
+    return f"{stem}.csv{OUTPUT_COMPRESSIONS[compression]}"
+
+
+def with_csv_suffix(path: Path, compression: str) -> Path:
+    # data/clean.csv + zstd -> data/clean.csv.zst (left alone if already there)
+    suffix = OUTPUT_COMPRESSIONS[compression]
+    return path if not suffix or path.name.endswith(suffix) else path.with_name(path.name + suffix)
+
+
+def _member_pieces(path: Path) -> Iterator[bytes]:
+    """
+    Decompressed bytes of a .gz/.zst file (multi-member gzip and multi-frame
+    zstd read as one stream) or of all CSV members of a .zip, in name order,
+    with the repeated header of every member after the first dropped.
+    """
+    codec = compression_of(path)
+    if codec != "zip":
+        with pa.input_stream(str(path), compression=codec) as f:
+            while piece := f.read(PIECE_SIZE):
+                yield piece
+        return
+
+    with zipfile.ZipFile(path) as zf:
+        members = sorted(
+            (m for m in zf.infolist() if not m.is_dir() and m.filename.lower().endswith(".csv")),
+            key=lambda m: m.filename,
+        )
+        if not members:
+            raise ValueError(f"{path} has no .csv members")
+        header = None
+        for m in members:
+            with zf.open(m) as f:
+                line = f.readline()
+                if header is None:
+                    header = line
+                    yield line
+                elif line.rstrip(b"\r\n") != header.rstrip(b"\r\n"):
+                    raise ValueError(f"{path}: member {m.filename} has a different header")
+                last = b"\n"
+                while piece := f.read(PIECE_SIZE):
+                    last = piece[-1:]
+                    yield piece
+                if last != b"\n":
+                    yield b"\n"
+
+
+def _prefetch(pieces: Iterable[bytes], depth: int = PREFETCH_PIECES) -> Iterator[bytes]:
+    # Decompress on a background thread (zlib/zstd release the GIL) while the caller parses
+    done = object()
+    stop = threading.Event()
+    q: queue.Queue = queue.Queue(depth)
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def work():
+        try:
+            for piece in pieces:
+                if not put(piece):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    t = threading.Thread(target=work, daemon=True)
+    t.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        t.join()
+
+
+class _DecompressedStream(io.RawIOBase):
+    # Read-only, forward-only view of the decompressed bytes; tell() is the plain-CSV offset
+    def __init__(self, path: Path):
+        self.path = path
+        self._pieces = _prefetch(_member_pieces(path))
+        self._buf = memoryview(b"")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf:
+            piece = next(self._pieces, None)
+            if piece is None:
+                return 0
+            self._buf = memoryview(piece)
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        self._pos += n
+        return n
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        if not self.closed:
+            self._pieces.close()
+            IO_STATS["read_stored"] += self.path.stat().st_size
+            IO_STATS["read_plain"] += self._pos
+        super().close()
+
+
+def open_raw(path: Path) -> BinaryIO:
+    """
+    Open a CSV for binary reading, decompressing .gz/.zst/.zip on the fly.
+    Compressed streams are not seekable; see skip_to.
+    """
+    if compression_of(path) is None:
+        return open(path, "rb")
+    return io.BufferedReader(_DecompressedStream(path), buffer_size=1 << 20)
+
+
+def skip_to(f: BinaryIO, offset: int) -> None:
+    if f.seekable():
+        f.seek(offset)
+        return
+    while f.tell() < offset:
+        if not f.read(min(PIECE_SIZE, offset - f.tell())):
+            break
+
+
+def write_csv(
+    df: pd.DataFrame,
+    path: Path,
+    compression: str = "none",
+    header: bool = True,
+    append: bool = False,
+    durable: bool = False,
+) -> int:
+    """
+    Write (or append) df as CSV, compressed when compression != "none".
+    Appends add a new gzip member / zstd frame, which readers see as one
+    stream. Returns the file size afterwards.
+    """
+    mode = "ab" if append else "wb"
+    if compression == "none":
+        with open(path, mode) as f:
+            df.to_csv(f, header=header, index=False)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+            return f.tell()
+
+    before = path.stat().st_size if append and path.exists() else 0
+    # Closing the compressed stream closes the file too
+    z = pa.CompressedOutputStream(open(path, mode), compression)
+    df.to_csv(z, header=header, index=False)
+    plain = z.tell()
+    z.close()
+    size = path.stat().st_size
+    if durable:
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+    IO_STATS["write_stored"] += size - before
+    IO_STATS["write_plain"] += plain
+    return size
+
+
+def record_parquet_sizes(root: Path) -> None:
+    # Compressed vs. uncompressed column chunk bytes from the Parquet footers
+    for f in root.rglob("*.parquet"):
+        meta = pq.ParquetFile(f).metadata
+        for i in range(meta.num_row_groups):
+            rg = meta.row_group(i)
+            for j in range(rg.num_columns):
+                col = rg.column(j)
+                IO_STATS["write_stored"] += col.total_compressed_size
+                IO_STATS["write_plain"] += col.total_uncompressed_size
+
+
+def report_io_savings() -> None:
+    for kind in ["read", "write"]:
+        stored, plain = IO_STATS[f"{kind}_stored"], IO_STATS[f"{kind}_plain"]
+        if plain:
+            verb = "Read" if kind == "read" else "Wrote"
+            print(
+                f"{verb} {format_bytes(stored)} compressed for {format_bytes(plain)} of data "
+                f"({format_bytes(plain - stored)} I/O saved, x{plain / max(stored, 1):.1f})"
+            )
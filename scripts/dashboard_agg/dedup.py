@@ -0,0 +1,110 @@
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Raw BTS columns identifying one flight: date, carrier, flight number, origin, scheduled departure
+DEDUP_RAW_KEYS = ["fl_date", "op_unique_carrier", "op_carrier_fl_num", "origin", "crs_dep_time"]
+
+# Per raw file hash arrays of the rows it contributed, under the multi-file output directory
+DEDUP_DIR = "_dedup"
+
+
+def hash_keys(chunk: pd.DataFrame, keys: Sequence[str] = DEDUP_RAW_KEYS) -> np.ndarray:
+    """
+    64-bit hash per row of the key columns. Numeric keys are hashed as Int64
+    and text keys by value, so the hashes do not depend on the dtypes the
+    reader picked (category, string, float32, ...).
+    """
+    cols = {}
+    for k in keys:
+        s = chunk[k]
+        if pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+            s = s.astype("Int64")
+        cols[k] = s
+    return pd.util.hash_pandas_object(pd.DataFrame(cols), index=False).to_numpy()
+
+
+class KeyIndex:
+    """
+    Set of uint64 key hashes kept as a few sorted numpy runs (no Python
+    objects per key, 8 bytes each). Runs are merged when a new one is at
+    least as large as the one before it, so there are O(log n) runs to
+    search and every key is re-merged O(log n) times.
+    """
+
+    def __init__(self, hashes: Optional[np.ndarray] = None):
+        self._runs: list[np.ndarray] = []
+        if hashes is not None and len(hashes):
+            self.add(hashes)
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self._runs)
+
+    def contains_sorted(self, hashes: np.ndarray) -> np.ndarray:
+        # Membership of sorted hashes (sorted lookups walk each run in cache order)
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            pos = np.searchsorted(run, hashes)
+            pos[pos == len(run)] = 0
+            found |= run[pos] == hashes
+        return found
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        order = np.argsort(hashes)
+        found = np.empty(len(hashes), dtype=bool)
+        found[order] = self.contains_sorted(hashes[order])
+        return found
+
+    def add(self, hashes: np.ndarray, is_sorted_unique: bool = False) -> None:
+        # Callers only add hashes that are not in the index yet
+        run = hashes.astype(np.uint64, copy=False)
+        if not is_sorted_unique:
+            run = np.unique(run)
+        if not len(run):
+            return
+        while self._runs and len(self._runs[-1]) <= len(run):
+            run = np.sort(np.concatenate([self._runs.pop(), run]), kind="stable")
+        self._runs.append(run)
+
+    def to_array(self) -> np.ndarray:
+        return np.sort(np.concatenate(self._runs)) if self._runs else np.empty(0, dtype=np.uint64)
+
+
+def drop_duplicate_flights(chunk: pd.DataFrame, index: KeyIndex) -> Tuple[pd.DataFrame, np.ndarray, int]:
+    """
+    Drop rows whose key was seen earlier in the chunk or is already in the
+    index, then add the kept keys to the index. Returns the kept rows, their
+    hashes (sorted) and the number of rows dropped.
+    """
+    h = hash_keys(chunk)
+    # Stable sort: the first row of every run of equal keys is the first in file order
+    order = np.argsort(h, kind="stable")
+    sh = h[order]
+    dup_sorted = index.contains_sorted(sh)
+    dup_sorted[1:] |= sh[1:] == sh[:-1]
+    kept = sh[~dup_sorted]
+    index.add(kept, is_sorted_unique=True)
+
+    n_dup = int(dup_sorted.sum())
+    if not n_dup:
+        return chunk, kept, 0
+    dup = np.empty(len(h), dtype=bool)
+    dup[order] = dup_sorted
+    return chunk[~dup], kept, n_dup
+
+
+def keys_path(out_dir: Path, raw_name: str) -> Path:
+    return out_dir / DEDUP_DIR / f"{raw_name}.npy"
+
+
+def load_keys(path: Path) -> np.ndarray:
+    return np.load(path) if path.exists() else np.empty(0, dtype=np.uint64)
+
+
+def save_keys(path: Path, hashes: np.ndarray) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp.npy")
+    np.save(tmp, hashes)
+    tmp.replace(path)
@@ -0,0 +1,139 @@
+import glob
+import hashlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .checkpoint import load_manifest, save_manifest
+from .compression import raw_stem
+
+INGEST_MANIFEST = "_ingest_manifest.json"
+RAW_PATTERNS = ["*.csv", "*.csv.gz", "*.csv.zst", "*.zip"]
+
+
+def is_multi_raw(spec: str) -> bool:
+    return Path(spec).is_dir() or any(ch in spec for ch in "*?[")
+
+
+def discover_raw_files(spec: str) -> List[Path]:
+    """
+    Expand --raw into raw files: a directory (its CSV files and .zip/.gz/.zst
+    archives) or a glob pattern.
+    """
+    p = Path(spec)
+    if p.is_dir():
+        files = [f for pattern in RAW_PATTERNS for f in p.glob(pattern)]
+    else:
+        files = [Path(f) for f in glob.glob(spec)]
+    return sorted(f for f in files if f.is_file())
+
+
+def check_output_names(files: List[Path]) -> None:
+    # Each raw file is written to <out dir>/<raw_stem>; two files must not share one
+    by_stem: dict = {}
+    for f in files:
+        by_stem.setdefault(raw_stem(f), []).append(f)
+    clashes = {stem: fs for stem, fs in by_stem.items() if len(fs) > 1}
+    if clashes:
+        listed = "; ".join(f"{', '.join(str(f) for f in fs)} -> {stem}" for stem, fs in sorted(clashes.items()))
+        raise ValueError(f"raw files would share an output name, rename them: {listed}")
+
+
+def manifest_key(path: Path) -> str:
+    # Keyed by resolved path, so same-named files in different directories stay apart
+    return str(path.resolve())
+
+
+def file_hash(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_ingest_manifest(out_dir: Path) -> dict:
+    return load_manifest(out_dir / INGEST_MANIFEST) or {"files": {}}
+
+
+def save_ingest_manifest(out_dir: Path, manifest: dict) -> None:
+    save_manifest(out_dir / INGEST_MANIFEST, manifest)
+
+
+def plan_ingest(
+    files: List[Path],
+    manifest: dict,
+    column_profile: str = "default",
+    dedup: bool = False,
+    fmt: str = "csv",
+    compression: str = "none",
+) -> List[Tuple[Path, str, Optional[str]]]:
+    """
+    Decide which raw files need processing.
+
+    Returns (path, reason, sha256) for every new or changed file, or file
+    last ingested with another column profile, --dedup setting, output
+    format or compression. Files whose size and mtime
+    match the manifest are skipped without hashing; if only the mtime moved
+    but the content hash is unchanged, the manifest entry is refreshed in
+    place and the file is skipped too.
+    """
+    todo = []
+    for path in files:
+        st = path.stat()
+        key = manifest_key(path)
+        if key not in manifest["files"] and path.name in manifest["files"]:
+            # Manifests written before entries were keyed by path
+            manifest["files"][key] = manifest["files"].pop(path.name)
+        entry = manifest["files"].get(key)
+        if entry is None:
+            todo.append((path, "new", None))
+            continue
+        if entry.get("columns", "default") != column_profile:
+            todo.append((path, "columns changed", None))
+            continue
+        if entry.get("dedup", False) != dedup:
+            todo.append((path, "dedup changed", None))
+            continue
+        if entry.get("format", "csv") != fmt:
+            todo.append((path, "format changed", None))
+            continue
+        if entry.get("compression", "none") != compression:
+            todo.append((path, "compression changed", None))
+            continue
+        if entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+            continue
+        digest = file_hash(path)
+        if digest == entry["sha256"]:
+            entry["mtime"] = st.st_mtime
+            continue
+        todo.append((path, "changed", digest))
+    return todo
+
+
+def record_ingested(
+    manifest: dict,
+    path: Path,
+    out: Path,
+    digest: Optional[str] = None,
+    column_profile: str = "default",
+    dedup: bool = False,
+    fmt: str = "csv",
+    compression: str = "none",
+) -> None:
+    st = path.stat()
+    manifest["files"][manifest_key(path)] = {
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "sha256": digest or file_hash(path),
+        "out": str(out),
+        "columns": column_profile,
+        "dedup": dedup,
+        "format": fmt,
+        "compression": compression,
+    }
+
+
+def stale_entries(files: List[Path], manifest: dict) -> List[str]:
+    # Manifest entries whose raw file is no longer part of the input set
+    present = {manifest_key(f) for f in files}
+    return sorted(name for name in manifest["files"] if name not in present)
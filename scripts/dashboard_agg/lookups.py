@@ -0,0 +1,136 @@
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from .profiling import DISABLED, Profiler
+
+AIRPORT_LOOKUP_COLS = ["iata", "city", "state"]
+AIRPORT_SIDES = [
+    ["origin_airport", "origin_city", "origin_state"],
+    ["destination_airport", "destination_city", "destination_state"],
+]
+
+# Curated carrier names (maintained here, applied by fill_airline_lookup.py and the ETL's --lookups-out)
+CODE_TO_NAME = {
+    "9E": "Endeavor Air",
+    "AA": "American Airlines",
+    "AS": "Alaska Airlines",
+    "B6": "JetBlue Airways",
+    "DL": "Delta Air Lines",
+    "F9": "Frontier Airlines",
+    "G4": "Allegiant Air",
+    "HA": "Hawaiian Airlines",
+    "MQ": "Envoy Air",
+    "NK": "Spirit Airlines",
+    "OH": "PSA Airlines",
+    "OO": "SkyWest Airlines",
+    "UA": "United Airlines",
+    "WN": "Southwest Airlines",
+    "YX": "Republic Airways",
+}
+
+
+def airline_codes(chunk: pd.DataFrame) -> set:
+    return set(chunk["operating_airline"].dropna().astype(str).str.strip().unique().tolist())
+
+
+def airport_rows(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    One (iata, city, state) row per airport in the chunk: origins then
+    destinations, the last complete row seen for an airport winning.
+    """
+    sides = []
+    for cols in AIRPORT_SIDES:
+        # Dedupe the raw triples first (cheap on categoricals), then clean the few that are left
+        side = chunk[cols].dropna().drop_duplicates(keep="last")
+        sides.append(pd.DataFrame({
+            "iata": side[cols[0]].astype(str).str.strip().to_numpy(),
+            "city": side[cols[1]].astype(object).to_numpy(),
+            "state": side[cols[2]].astype(object).to_numpy(),
+        }))
+    return pd.concat(sides, ignore_index=True).drop_duplicates(subset=["iata"], keep="last")
+
+
+def merge_airports(acc: Optional[pd.DataFrame], rows: pd.DataFrame) -> pd.DataFrame:
+    # Later chunks win, as with per-row dict updates in file order
+    if acc is None:
+        return rows
+    return pd.concat([acc, rows], ignore_index=True).drop_duplicates(subset=["iata"], keep="last")
+
+
+def fill_airline_names(df: pd.DataFrame) -> pd.DataFrame:
+    # Blank airline_name values from CODE_TO_NAME; names already set are kept
+    blank = df["airline_name"].isna() | df["airline_name"].isin(["", "nan", "None"])
+    df.loc[blank, "airline_name"] = df.loc[blank, "operating_airline"].map(CODE_TO_NAME).fillna("")
+    return df
+
+
+def airline_lookup(codes: set, out_csv: Path) -> pd.DataFrame:
+    # airline_name values already in out_csv are kept; new codes get a blank name
+    df = pd.DataFrame({"operating_airline": sorted(codes)})
+    if not out_csv.exists():
+        df["airline_name"] = ""
+        return df
+
+    old_df = pd.read_csv(out_csv)
+    old_df["operating_airline"] = old_df["operating_airline"].astype(str).str.strip()
+    if "airline_name" not in old_df.columns:
+        old_df["airline_name"] = ""
+
+    merged = df.merge(old_df[["operating_airline", "airline_name"]], on="operating_airline", how="left")
+    merged["airline_name"] = merged["airline_name"].fillna("")
+    return merged
+
+
+def airport_lookup(acc: Optional[pd.DataFrame]) -> pd.DataFrame:
+    if acc is None:
+        return pd.DataFrame(columns=AIRPORT_LOOKUP_COLS)
+    return acc.sort_values("iata")
+
+
+class LookupCollector:
+    """
+    Distinct airline codes and airports of a stream of clean chunks; the
+    state is one row per airline and per airport.
+    """
+
+    def __init__(self):
+        self.codes: set = set()
+        self.airports: Optional[pd.DataFrame] = None
+
+    def update(self, chunk: pd.DataFrame, prof: Profiler = DISABLED, chunk_index: Optional[int] = None) -> None:
+        with prof.stage("airlines:collect", len(chunk), chunk_index):
+            self.codes |= airline_codes(chunk)
+        with prof.stage("airports:collect", len(chunk), chunk_index):
+            self.airports = merge_airports(self.airports, airport_rows(chunk))
+
+    def write(
+        self,
+        outdir: Path,
+        prof: Profiler = DISABLED,
+        keep_existing: bool = False,
+        fill_names: bool = False,
+    ) -> None:
+        """
+        Write airlines.csv and airports.csv. keep_existing adds the entries
+        already in outdir (for runs that only saw part of the data);
+        fill_names fills blank airline names from CODE_TO_NAME.
+        """
+        outdir.mkdir(parents=True, exist_ok=True)
+        airlines_csv, airports_csv = outdir / "airlines.csv", outdir / "airports.csv"
+        codes, airports = self.codes, self.airports
+        if keep_existing:
+            if airlines_csv.exists():
+                codes = codes | set(pd.read_csv(airlines_csv, dtype=str)["operating_airline"].dropna().str.strip())
+            if airports_csv.exists():
+                old = pd.read_csv(airports_csv, dtype=str, keep_default_na=False)[AIRPORT_LOOKUP_COLS]
+                airports = old if airports is None else merge_airports(old, airports)
+
+        airlines = airline_lookup(codes, airlines_csv)
+        if fill_names:
+            airlines = fill_airline_names(airlines)
+        for out_csv, df in [(airlines_csv, airlines), (airports_csv, airport_lookup(airports))]:
+            with prof.stage(f"{out_csv.stem}:write", len(df)):
+                df.to_csv(out_csv, index=False)
+            print("Wrote:", out_csv)
@@ -0,0 +1,228 @@
+import resource
+import sys
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+import pandas as pd
+
+SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+# Lower bound on how many times its parsed size a chunk grows while a stage
+# works on it (string parsing, derived columns, key codes, copies). The
+# ChunkSizer measures the real cost on the probe chunk; these only matter
+# when that measurement misses the work (e.g. --workers, where it runs in
+# the pool). Calibrated against the peak RSS of full-size runs.
+ETL_WORKING_FACTOR = 12.0
+TABLES_WORKING_FACTOR = 8.0
+LOOKUPS_WORKING_FACTOR = 4.0
+
+ChunkSize = Union[int, Callable[[], int]]
+
+
+def parse_size(text: str) -> int:
+    """
+    "2G", "512M", "1.5g" or a plain byte count -> bytes.
+    """
+    text = text.strip().upper().removesuffix("B")
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def format_bytes(n: float) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if n < 1024:
+            return f"{n:,.1f} {unit}"
+        n /= 1024
+    return f"{n:,.1f} TB"
+
+
+# Highest peak seen before the last reset_peak_rss()
+_peak_before_reset = 0
+# Open PeakWatch windows, told about the peak before every reset
+_watches: list = []
+
+
+def rss_bytes() -> Optional[int]:
+    # Current resident set size (Linux only)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def window_peak_rss_bytes(children: bool = False) -> int:
+    # Peak RSS since process start or since the last reset_peak_rss()
+    if not children:
+        # VmHWM covers this process only; ru_maxrss also keeps the peak of
+        # whatever ran before exec (e.g. a large parent that forked us)
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def peak_rss_bytes(children: bool = False) -> int:
+    if children:
+        return window_peak_rss_bytes(children=True)
+    return max(window_peak_rss_bytes(), _peak_before_reset)
+
+
+def reset_peak_rss() -> bool:
+    """
+    Restart the RSS high-water mark so the peak of the next stage can be
+    measured on its own (Linux only; returns False elsewhere).
+    peak_rss_bytes() still reports the whole-run peak.
+    """
+    global _peak_before_reset
+    _peak_before_reset = peak_rss_bytes()
+    window = window_peak_rss_bytes()
+    for watch in _watches:
+        watch.peak = max(watch.peak, window)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class PeakWatch:
+    """
+    Peak RSS from creation until close(), kept across the reset_peak_rss()
+    calls of the profiler. Where the high-water mark cannot be reset this is
+    the whole-run peak, i.e. an overestimate.
+    """
+
+    def __init__(self):
+        self.peak = 0
+        reset_peak_rss()
+        _watches.append(self)
+
+    def peak_bytes(self) -> int:
+        return max(self.peak, window_peak_rss_bytes())
+
+    def close(self) -> int:
+        peak = self.peak_bytes()
+        if self in _watches:
+            _watches.remove(self)
+        return peak
+
+
+def report_peak_rss(label: str = "") -> None:
+    msg = f"Peak RSS{' (' + label + ')' if label else ''}: {format_bytes(peak_rss_bytes())}"
+    children = peak_rss_bytes(children=True)
+    if children:
+        msg += f", largest worker: {format_bytes(children)}"
+    print(msg)
+
+
+class ChunkSizer:
+    """
+    Rows-per-chunk under a memory budget for the whole process.
+
+    The first chunk is a small probe. The RSS growth from just before it is
+    read until the next chunk is asked for (i.e. after the stage is done with
+    it) gives the working cost of one row, never less than its parsed size
+    times `working_factor`. Every later chunk is then sized so that
+    `in_flight` chunks fit in what the budget leaves above the current RSS,
+    which also covers state that grows over the run (cube accumulators,
+    dedup index). Call the sizer to get the size of the next chunk.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        working_factor: float,
+        in_flight: int = 1,
+        probe_rows: int = 50_000,
+        min_rows: int = 1_000,
+        label: str = "",
+    ):
+        self.budget_bytes = budget_bytes
+        self.working_factor = working_factor
+        self.in_flight = max(1, in_flight)
+        self.min_rows = min_rows
+        self.label = label
+        self.size = probe_rows
+        self.bytes_per_row: Optional[float] = None
+        self._watch: Optional[PeakWatch] = None
+        self._probe_start = 0
+        self._probe_rows = 0
+        self._parsed_bytes_per_row = 0.0
+        self._over = False
+
+    def __call__(self) -> int:
+        if self._watch is None and self.bytes_per_row is None:
+            # About to read the probe chunk
+            self._probe_start = self._rss()
+            self._watch = PeakWatch()
+        elif self._probe_rows:
+            if self.bytes_per_row is None:
+                self._calibrate()
+            else:
+                self._resize()
+            if self.size == self.min_rows and not self._over:
+                self._over = True
+                print(f"Warning: RSS is already {format_bytes(self._rss())}; "
+                      f"chunks of {self.min_rows:,} rows may exceed the budget")
+        return self.size
+
+    def observe(self, chunk: pd.DataFrame) -> None:
+        if self._probe_rows or len(chunk) == 0:
+            return
+        self._probe_rows = len(chunk)
+        self._parsed_bytes_per_row = chunk.memory_usage(deep=True).sum() / len(chunk)
+
+    def _calibrate(self) -> None:
+        grown = self._watch.close() - self._probe_start
+        self._watch = None
+        self.bytes_per_row = max(grown / self._probe_rows, self._parsed_bytes_per_row * self.working_factor)
+        self._resize()
+        print(
+            f"Memory budget {format_bytes(self.budget_bytes)}{' for ' + self.label if self.label else ''}: "
+            f"{self.bytes_per_row:,.0f} B/row while processed ({self._parsed_bytes_per_row:,.0f} parsed) "
+            f"-> chunksize {self.size:,}"
+        )
+
+    @staticmethod
+    def _rss() -> int:
+        return rss_bytes() or peak_rss_bytes()
+
+    def _resize(self) -> None:
+        per_chunk = self.bytes_per_row * self.in_flight
+        self.size = max(self.min_rows, int((self.budget_bytes - self._rss()) / per_chunk))
+
+
+def make_chunksize(
+    default: int,
+    budget_bytes: Optional[int],
+    working_factor: float,
+    in_flight: int = 1,
+    label: str = "",
+) -> ChunkSize:
+    if budget_bytes is None:
+        return default
+    return ChunkSizer(budget_bytes, working_factor, in_flight=in_flight, label=label)
+
+
+def observe_chunks(chunks: Iterable[pd.DataFrame], chunksize: ChunkSize) -> Iterator[pd.DataFrame]:
+    # Let an adaptive sizer see each parsed chunk before it is handed on
+    for chunk in chunks:
+        if isinstance(chunksize, ChunkSizer):
+            chunksize.observe(chunk)
+        yield chunk
+
+
+def size_fn(chunksize: ChunkSize) -> Callable[[], int]:
+    return chunksize if callable(chunksize) else (lambda: chunksize)
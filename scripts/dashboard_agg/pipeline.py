@@ -1,53 +1,140 @@
 from pathlib import Path
 import pandas as pd
-from typing import Dict, Optional
+from typing import Dict, Optional, Sequence
 
+from .compression import csv_name, write_csv
+from .memory import TABLES_WORKING_FACTOR, make_chunksize, observe_chunks
+from .profiling import DISABLED, Profiler
+from .schema import TABLES_COLS
+from .storage import iter_clean_chunks
 from .transforms import ensure_columns
-from .aggregations import agg_metrics, accumulate, finalize
+from .aggregations import CubeAccumulator, chunk_metrics, factorize_keys, finalize
+from .rollup import plan_rollups, rollup_cubes
 
-def build_tables(
-    infile: Path,
+CORE_KEYS = ["month", "month_name", "origin_state_abbr", "operating_airline"]
+
+# Cube name -> group keys (written as cube_<name>.csv)
+CUBE_KEYS = {
+    "core": CORE_KEYS,
+    "hour": CORE_KEYS + ["scheduled_departure_hour"],
+    "cause": CORE_KEYS + ["delay_cause"],
+    "routes": ["month","month_name","operating_airline","origin_state","destination_state","delay_cause"],
+    "airport": CORE_KEYS + ["origin_airport"],
+}
+
+# Only the finest cubes are aggregated from rows (MATERIALIZED_KEYS, which may
+# carry extra keys for their children); the rest are rolled up from them when
+# the cubes are written
+MATERIALIZED_KEYS, DERIVED_CUBES = plan_rollups(CUBE_KEYS)
+
+# Key columns factorized once per chunk for all materialized cubes
+KEY_COLS = list(dict.fromkeys(k for keys in MATERIALIZED_KEYS.values() for k in keys))
+
+# Running cubes (update_tables) and cube frames indexed by their keys (write_tables)
+Accumulators = Dict[str, CubeAccumulator]
+Cubes = Dict[str, Optional[pd.DataFrame]]
+
+def update_tables(
+    accs: Accumulators,
+    chunk: pd.DataFrame,
+    prof: Profiler = DISABLED,
+    chunk_index: Optional[int] = None,
+) -> None:
+    """
+    Fold one cleaned chunk into the running accumulators of the materialized
+    cubes (in place); write_tables derives the others.
+    """
+    rows = len(chunk)
+    with prof.stage("ensure_columns", rows, chunk_index):
+        chunk = ensure_columns(chunk)
+    with prof.stage("metrics", rows, chunk_index):
+        metrics = chunk_metrics(chunk)
+        key_codes = factorize_keys(chunk, KEY_COLS)
+    for name, keys in MATERIALIZED_KEYS.items():
+        with prof.stage(f"accumulate:{name}", rows, chunk_index):
+            if name not in accs:
+                accs[name] = CubeAccumulator(keys)
+            accs[name].add(key_codes, metrics)
+
+def cube_frames(accs: Accumulators, prof: Profiler = DISABLED) -> Cubes:
+    out: Cubes = {}
+    for name in MATERIALIZED_KEYS:
+        acc = accs.get(name)
+        with prof.stage(f"to_frame:{name}", len(acc) if acc is not None else None):
+            out[name] = acc.to_frame() if acc is not None else None
+    return out
+
+def write_tables(
+    cubes: Cubes,
     outdir: Path,
-    chunksize: int = 500_000,
     top_airports: int = 150,
+    compression: str = "none",
+    prof: Profiler = DISABLED,
 ) -> None:
     outdir.mkdir(parents=True, exist_ok=True)
+    cubes = rollup_cubes(cubes, CUBE_KEYS, DERIVED_CUBES, prof)
 
-    acc_core = None
-    acc_hour = None
-    acc_cause = None
-    acc_routes = None
-    acc_airport = None
+    for name in ["core", "hour", "cause", "routes"]:
+        with prof.stage("finalize") as info:
+            cube = finalize(cubes[name])
+            info["rows"] = len(cube)
+        with prof.stage("write_cubes", len(cube)):
+            write_csv(cube, outdir / csv_name(f"cube_{name}", compression), compression)
 
-    core_keys = ["month", "month_name", "origin_state_abbr", "operating_airline"]
-    hour_keys = core_keys + ["scheduled_departure_hour"]
-    cause_keys = core_keys + ["delay_cause"]
-    airport_keys = core_keys + ["origin_airport"]
-    route_keys = ["month","month_name","operating_airline","origin_state","destination_state","delay_cause"]
+    # airport cube
+    with prof.stage("finalize") as info:
+        airport = finalize(cubes["airport"])
+        airport_totals = airport.groupby("origin_airport", dropna=False)["flights"].sum().sort_values(ascending=False)
+        keep = set(airport_totals.head(top_airports).index.tolist())
+        airport = airport[airport["origin_airport"].isin(keep)]
+        info["rows"] = len(airport)
+    with prof.stage("write_cubes", len(airport)):
+        write_csv(airport, outdir / csv_name("cube_airport_top", compression), compression)
 
-    for chunk in pd.read_csv(infile, chunksize=chunksize, low_memory=False):
-        chunk = ensure_columns(chunk)
+def year_dir(outdir: Path, year: int) -> Path:
+    return outdir / f"year={year}"
 
-        g_core = agg_metrics(chunk, core_keys)
-        g_hour = agg_metrics(chunk, hour_keys)
-        g_cause = agg_metrics(chunk, cause_keys)
-        g_routes = agg_metrics(chunk, route_keys)
-        g_airport = agg_metrics(chunk, airport_keys)
+def build_tables(
+    infile: Path,
+    outdir: Path,
+    chunksize: int = 500_000,
+    top_airports: int = 150,
+    months: Optional[Sequence[int]] = None,
+    reader: str = "pandas",
+    memory_budget: Optional[int] = None,
+    compression: str = "none",
+    prof: Profiler = DISABLED,
+    years: Optional[Sequence[int]] = None,
+    by_year: bool = False,
+) -> None:
+    """
+    Aggregate the cleaned dataset into the dashboard cubes.
 
-        acc_core = accumulate(acc_core, g_core, core_keys)
-        acc_hour = accumulate(acc_hour, g_hour, hour_keys)
-        acc_cause = accumulate(acc_cause, g_cause, cause_keys)
-        acc_routes = accumulate(acc_routes, g_routes, route_keys)
-        acc_airport = accumulate(acc_airport, g_airport, airport_keys)
+    With by_year the cubes are partitioned as outdir/year=YYYY/cube_*.csv
+    (top airports are picked per year); only the years present in the data
+    read (or in `years`) are rewritten.
+    """
+    # year is read for --years as well, and dropped again unless partitioning by it
+    columns = TABLES_COLS + ["year"] if by_year or years is not None else TABLES_COLS
+    size = make_chunksize(chunksize, memory_budget, TABLES_WORKING_FACTOR, label="build_tables")
+    chunks = iter_clean_chunks(infile, chunksize=size, columns=columns, months=months, reader=reader, years=years)
 
-    finalize(acc_core).to_csv(outdir / "cube_core.csv", index=False)
-    finalize(acc_hour).to_csv(outdir / "cube_hour.csv", index=False)
-    finalize(acc_cause).to_csv(outdir / "cube_cause.csv", index=False)
-    finalize(acc_routes).to_csv(outdir / "cube_routes.csv", index=False)
+    accs: Accumulators = {}
+    accs_by_year: Dict[int, Accumulators] = {}
+    for i, chunk in enumerate(prof.timed_iter("read", observe_chunks(chunks, size))):
+        if not by_year:
+            update_tables(accs, chunk.drop(columns="year", errors="ignore"), prof, chunk_index=i)
+            continue
+        for year, part in chunk.groupby("year", observed=True, sort=False):
+            update_tables(accs_by_year.setdefault(int(year), {}), part.drop(columns="year"), prof, chunk_index=i)
 
-    # airport cube
-    airport = finalize(acc_airport)
-    airport_totals = airport.groupby("origin_airport", dropna=False)["flights"].sum().sort_values(ascending=False)
-    keep = set(airport_totals.head(top_airports).index.tolist())
-    airport = airport[airport["origin_airport"].isin(keep)]
-    airport.to_csv(outdir / "cube_airport_top.csv", index=False)
+    if not by_year:
+        write_tables(cube_frames(accs, prof), outdir, top_airports=top_airports, compression=compression, prof=prof)
+        return
+    if not accs_by_year:
+        raise ValueError(f"no rows in {infile} for years {years}")
+    for year, year_accs in sorted(accs_by_year.items()):
+        write_tables(
+            cube_frames(year_accs, prof), year_dir(outdir, year),
+            top_airports=top_airports, compression=compression, prof=prof,
+        )
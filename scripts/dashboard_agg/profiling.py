@@ -0,0 +1,143 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .memory import format_bytes, reset_peak_rss, window_peak_rss_bytes
+
+
+class Profiler:
+    """
+    Wall time, rows and peak RSS per stage and per chunk (--profile).
+
+    A disabled profiler makes stage() and timed_iter() pass-throughs, so the
+    instrumented code costs nothing without --profile. Stages may nest; a
+    stage's seconds include its children, and its peak is measured by
+    restarting the RSS high-water mark when the stage starts.
+    """
+
+    def __init__(self, script: str = "", enabled: bool = True):
+        self.script = script
+        self.enabled = enabled
+        self.scope: Optional[str] = None  # e.g. the raw file being processed
+        self.started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self._t0 = time.perf_counter()
+        self._stages: Dict[str, dict] = {}
+        self._chunks: Dict[tuple, dict] = {}
+        self._open_peaks: list[int] = []
+        self._run_peak = 0
+        self._counters: Dict[str, int] = {}
+        if enabled:
+            # ru_maxrss survives fork/exec, so a child would start with its parent's peak
+            reset_peak_rss()
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None, chunk: Optional[int] = None):
+        # Yields a dict; set "rows" in it when the row count is only known afterwards
+        info: Dict[str, Any] = {"rows": rows}
+        if not self.enabled:
+            yield info
+            return
+        if self._open_peaks:
+            self._open_peaks[-1] = max(self._open_peaks[-1], window_peak_rss_bytes())
+        reset_peak_rss()
+        self._open_peaks.append(0)
+        t = time.perf_counter()
+        try:
+            yield info
+        finally:
+            seconds = time.perf_counter() - t
+            peak = max(self._open_peaks.pop(), window_peak_rss_bytes())
+            if self._open_peaks:
+                self._open_peaks[-1] = max(self._open_peaks[-1], peak)
+            self._run_peak = max(self._run_peak, peak)
+            if not info.get("skip"):
+                self._record(name, seconds, info["rows"], peak, chunk)
+
+    def timed_iter(self, name: str, chunks: Iterable[pd.DataFrame], start: int = 0) -> Iterator[pd.DataFrame]:
+        # Time each next() on chunks (parsing, decompression, ...) as stage `name`
+        if not self.enabled:
+            yield from chunks
+            return
+        it = iter(chunks)
+        for i in range(start, sys.maxsize):
+            with self.stage(name, chunk=i) as info:
+                chunk = next(it, None)
+                info["rows"] = len(chunk) if chunk is not None else None
+                info["skip"] = chunk is None
+            if chunk is None:
+                return
+            yield chunk
+
+    def count(self, name: str, n: int) -> None:
+        # Named event totals for the report (rows quarantined per rule, duplicates dropped, ...)
+        if self.enabled:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def _record(self, name: str, seconds: float, rows: Optional[int], peak: int, chunk: Optional[int]) -> None:
+        s = self._stages.setdefault(name, {"calls": 0, "seconds": 0.0, "rows": 0, "peak_rss_bytes": 0})
+        s["calls"] += 1
+        s["seconds"] += seconds
+        s["rows"] += rows or 0
+        s["peak_rss_bytes"] = max(s["peak_rss_bytes"], peak)
+        if chunk is None:
+            return
+        c = self._chunks.setdefault((self.scope or "", chunk), {"rows": 0, "stages": {}})
+        c["rows"] = max(c["rows"], rows or 0)
+        cs = c["stages"].setdefault(name, {"seconds": 0.0, "peak_rss_bytes": 0})
+        cs["seconds"] += seconds
+        cs["peak_rss_bytes"] = max(cs["peak_rss_bytes"], peak)
+
+    def report(self, config: Optional[dict] = None) -> dict:
+        stages = {}
+        for name, s in self._stages.items():
+            stages[name] = dict(s, rows_per_sec=s["rows"] / s["seconds"] if s["rows"] and s["seconds"] else None)
+        chunks = []
+        for (scope, index), c in sorted(self._chunks.items()):
+            entry = {"index": index, "rows": c["rows"], "stages": c["stages"]}
+            if scope:
+                entry = {"file": scope, **entry}
+            chunks.append(entry)
+        return {
+            "script": self.script,
+            "started": self.started,
+            "argv": sys.argv,
+            "config": config or {},
+            "versions": {
+                "python": sys.version.split()[0],
+                "pandas": pd.__version__,
+                "numpy": np.__version__,
+                "pyarrow": pa.__version__,
+            },
+            "total_seconds": time.perf_counter() - self._t0,
+            "peak_rss_bytes": max(self._run_peak, window_peak_rss_bytes()),
+            "stages": stages,
+            "counters": dict(self._counters),
+            "chunks": chunks,
+        }
+
+    def write(self, path: Path, config: Optional[dict] = None) -> None:
+        if not self.enabled:
+            return
+        report = self.report(config)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+        print(f"Profile ({report['total_seconds']:.2f}s total, peak RSS {format_bytes(report['peak_rss_bytes'])}):")
+        for name, s in report["stages"].items():
+            rate = f"{s['rows_per_sec']:>14,.0f} rows/s" if s["rows_per_sec"] else " " * 21
+            print(f"  {name:<24} {s['seconds']:8.3f}s {rate}  peak {format_bytes(s['peak_rss_bytes'])}")
+        for name, n in report["counters"].items():
+            print(f"  {name:<24} {n:>9,}")
+        print(f"Wrote profile report: {path}")
+
+
+DISABLED = Profiler(enabled=False)
@@ -0,0 +1,92 @@
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from .profiling import DISABLED, Profiler
+
+# Key columns that are a function of another key column: a cube grouped by the
+# source column can carry them as extra keys without adding groups
+FUNCTIONAL_KEYS = {
+    "month_name": "month",
+    "origin_state_abbr": "origin_state",
+}
+
+
+def _closure(keys: list[str]) -> set:
+    out = set(keys)
+    while True:
+        more = {k for k, src in FUNCTIONAL_KEYS.items() if src in out} - out
+        if not more:
+            return out
+        out |= more
+
+
+def plan_rollups(cube_keys: Dict[str, list[str]]) -> Tuple[Dict[str, list[str]], Dict[str, list[str]]]:
+    """
+    Split cubes into the ones aggregated from rows and the ones rolled up
+    from another cube. Returns (materialized: name -> group keys, derived:
+    name -> candidate parents). Every metric is additive, so a cube whose
+    keys are a subset of another cube's is an exact rollup of it.
+
+    A cube is derived when its keys are a subset of a finer cube's keys, or
+    else of a materialized cube's keys plus the FUNCTIONAL_KEYS those
+    determine; that parent then also groups by the keys it carries for the
+    child. Cubes are planned finest first (most keys, then declaration order).
+    """
+    order = sorted(cube_keys, key=lambda name: -len(_closure(cube_keys[name])))
+    materialized: Dict[str, list[str]] = {}
+    derived: Dict[str, list[str]] = {}
+    for name in order:
+        keys = set(cube_keys[name])
+        parents = [p for p in materialized if keys <= set(materialized[p])]
+        parents += [p for p in derived if keys <= set(cube_keys[p])]
+        if not parents:
+            # Carry the missing keys in the materialized cubes that determine them
+            parents = [p for p in materialized if keys <= _closure(materialized[p])]
+            for p in parents:
+                materialized[p] += [k for k in cube_keys[name] if k not in materialized[p]]
+        if parents:
+            derived[name] = parents
+        else:
+            materialized[name] = list(cube_keys[name])
+    return materialized, derived
+
+
+def rollup(parent: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    # parent is indexed by a superset of keys; sums stay float64
+    if list(parent.index.names) == keys:
+        return parent
+    return parent.groupby(level=keys, dropna=False).sum()
+
+
+def rollup_cubes(
+    accs: Dict[str, Optional[pd.DataFrame]],
+    cube_keys: Dict[str, list[str]],
+    derived: Dict[str, list[str]],
+    prof: Profiler = DISABLED,
+) -> Dict[str, Optional[pd.DataFrame]]:
+    """
+    Every cube of cube_keys from the accumulated materialized cubes: the
+    materialized ones are rolled up to their own keys (dropping the carried
+    keys), the derived ones from their smallest available parent.
+    """
+    out: Dict[str, Optional[pd.DataFrame]] = {}
+    for name, keys in cube_keys.items():
+        if name in derived:
+            continue
+        acc = accs.get(name)
+        with prof.stage(f"rollup:{name}", len(acc) if acc is not None else None):
+            out[name] = rollup(acc, keys) if acc is not None else None
+    # derived is in planning order, so every parent is available before its children
+    for name, parents in derived.items():
+        keys = cube_keys[name]
+        # A parent's own cube is enough unless the keys are only in its carried keys
+        source = [out[p] if set(keys) <= set(cube_keys[p]) else accs.get(p) for p in parents]
+        source = [s for s in source if s is not None]
+        if not source:
+            out[name] = None
+            continue
+        parent = min(source, key=len)
+        with prof.stage(f"rollup:{name}", len(parent)):
+            out[name] = rollup(parent, keys)
+    return {name: out[name] for name in cube_keys}
@@ -0,0 +1,193 @@
+from typing import Dict, Iterable
+
+import pandas as pd
+
+from .constants import US_STATE_TO_ABBR
+
+# Column types for the raw BTS/Kaggle file (see data/raw/flight_data_2024_data_dictionary.csv).
+# Nullable ints keep compact types even when a chunk has missing values.
+RAW_DTYPES = {
+    "year": "Int16",
+    "month": "Int8",
+    "day_of_month": "Int8",
+    "day_of_week": "Int8",
+    "fl_date": "string",
+    "op_unique_carrier": "category",
+    "op_carrier_fl_num": "float32",
+    "origin": "category",
+    "origin_city_name": "category",
+    "origin_state_nm": "category",
+    "dest": "category",
+    "dest_city_name": "category",
+    "dest_state_nm": "category",
+    "crs_dep_time": "Int16",
+    "dep_time": "float32",
+    "dep_delay": "float32",
+    "taxi_out": "float32",
+    "wheels_off": "float32",
+    "wheels_on": "float32",
+    "taxi_in": "float32",
+    "crs_arr_time": "Int16",
+    "arr_time": "float32",
+    "arr_delay": "float32",
+    "cancelled": "Int8",
+    "cancellation_code": "category",
+    "diverted": "Int8",
+    "crs_elapsed_time": "float32",
+    "actual_elapsed_time": "float32",
+    "air_time": "float32",
+    "distance": "float32",
+    # Int32 so the per-row sum of the five causes cannot overflow
+    "carrier_delay": "Int32",
+    "weather_delay": "Int32",
+    "nas_delay": "Int32",
+    "security_delay": "Int32",
+    "late_aircraft_delay": "Int32",
+}
+
+# Column types for the cleaned dataset written by process_flight_data_in_chunks.py
+CLEAN_DTYPES = {
+    "flight_date": "string",
+    "operating_airline": "category",
+    "origin_airport": "category",
+    "origin_city": "category",
+    "origin_state": "category",
+    "destination_airport": "category",
+    "destination_city": "category",
+    "destination_state": "category",
+    "scheduled_departure_hhmm": "Int16",
+    "departure_delay_raw_min": "float32",
+    "scheduled_arrival_hhmm": "Int16",
+    "arrival_delay_raw_min": "float32",
+    "is_cancelled": "Int8",
+    "is_diverted": "Int8",
+    "carrier_delay_min": "Int32",
+    "weather_delay_min": "Int32",
+    "nas_delay_min": "Int32",
+    "security_delay_min": "Int32",
+    "late_aircraft_delay_min": "Int32",
+    "year": "Int16",
+    "month": "Int8",
+    "month_name": "category",
+    "day_of_month": "Int8",
+    "day_of_week_name": "category",
+    "week_of_year": "Int8",
+    "scheduled_departure_hour": "Int8",
+    "scheduled_departure_time": "category",
+    "origin_state_abbr": "category",
+    "destination_state_abbr": "category",
+    "is_operated": "boolean",
+    "arrival_delay_min": "float32",
+    "departure_delay_min": "float32",
+    "is_delayed_15": "boolean",
+    "total_delay_min": "float32",
+    "delay_bucket": "category",
+    "primary_delay_cause": "category",
+    "country": "category",
+    # analysis-extended only
+    "operating_flight_number": "Int32",
+    "distance_miles": "float32",
+    "taxi_out_min": "float32",
+    "taxi_in_min": "float32",
+    "air_time_min": "float32",
+    "scheduled_elapsed_min": "float32",
+    "actual_elapsed_min": "float32",
+    "cancellation_code": "category",
+}
+
+# Fixed code tables for low-cardinality label columns, so a label has the same
+# dictionary code in every chunk, file and run
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DELAY_BUCKET_LABELS = ["On time (≤15)", "16–30", "31–60", "61–120", "120+"]
+DELAY_CAUSE_LABELS = ["Carrier", "Weather", "NAS", "Security", "Late Aircraft", "No Delay"]
+STATE_ABBRS = sorted(set(US_STATE_TO_ABBR.values()))
+
+CATEGORY_LEVELS = {
+    "month_name": (MONTH_NAMES, True),
+    "day_of_week_name": (DAY_NAMES, True),
+    "delay_bucket": (DELAY_BUCKET_LABELS, True),
+    "primary_delay_cause": (DELAY_CAUSE_LABELS, False),
+    "country": (["United States"], False),
+    "origin_state_abbr": (STATE_ABBRS, False),
+    "destination_state_abbr": (STATE_ABBRS, False),
+}
+
+
+def category_dtype(col: str) -> pd.CategoricalDtype:
+    levels, ordered = CATEGORY_LEVELS[col]
+    return pd.CategoricalDtype(categories=levels, ordered=ordered)
+
+
+# Raw columns process_chunk keeps (everything else is dropped right after the read)
+ETL_RAW_COLS = [
+    "fl_date", "op_unique_carrier",
+    "origin", "origin_city_name", "origin_state_nm",
+    "dest", "dest_city_name", "dest_state_nm",
+    "crs_dep_time", "dep_delay", "crs_arr_time", "arr_delay",
+    "cancelled", "diverted",
+    "carrier_delay", "weather_delay", "nas_delay", "security_delay", "late_aircraft_delay",
+]
+
+# Extra raw measures kept by the analysis-extended profile
+ETL_EXTENDED_RAW_COLS = ETL_RAW_COLS + [
+    "op_carrier_fl_num", "distance", "taxi_out", "taxi_in", "air_time",
+    "crs_elapsed_time", "actual_elapsed_time", "cancellation_code",
+]
+
+# Raw columns the dashboard cubes depend on (no city names, no arrival schedule)
+ETL_LEAN_RAW_COLS = [
+    "fl_date", "op_unique_carrier",
+    "origin", "origin_state_nm", "dest", "dest_state_nm",
+    "crs_dep_time", "dep_delay", "arr_delay",
+    "cancelled", "diverted",
+    "carrier_delay", "weather_delay", "nas_delay", "security_delay", "late_aircraft_delay",
+]
+
+
+LOOKUP_AIRLINE_COLS = ["operating_airline"]
+LOOKUP_AIRPORT_COLS = [
+    "origin_airport", "origin_city", "origin_state",
+    "destination_airport", "destination_city", "destination_state",
+]
+
+# Cleaned columns read by dashboard_agg.pipeline.build_tables (via ensure_columns/agg_metrics)
+TABLES_COLS = [
+    "month", "month_name",
+    "operating_airline",
+    "origin_state", "origin_state_abbr", "destination_state",
+    "origin_airport", "destination_airport",
+    "scheduled_departure_hour",
+    "primary_delay_cause",
+    "is_delayed_15", "is_cancelled",
+    "arrival_delay_min", "departure_delay_min", "total_delay_min",
+]
+
+# Sort order of clustered ETL output (--cluster)
+CLUSTER_KEYS = ["year", "month", "operating_airline", "origin_state"]
+
+# Named ETL column profiles: "raw" is what is parsed from the raw CSV (pushed down
+# into the reader), "clean" is what is derived and written (None = every column
+# process_chunk derives from the raw columns, in its usual order)
+ETL_PROFILES = {
+    "default": {"raw": ETL_RAW_COLS, "clean": None},
+    "dashboard-lean": {"raw": ETL_LEAN_RAW_COLS, "clean": ["year"] + TABLES_COLS},
+    "analysis-extended": {"raw": ETL_EXTENDED_RAW_COLS, "clean": None},
+}
+
+# data/lookups/airlines.csv, as read by fill_airline_lookup.py
+LOOKUP_AIRLINE_DTYPES = {"operating_airline": "string", "airline_name": "string"}
+FILL_AIRLINE_COLS = ["operating_airline", "airline_name"]
+
+
+def dtypes_for(dtypes: Dict[str, str], cols: Iterable[str]) -> Dict[str, str]:
+    return {c: dtypes[c] for c in cols if c in dtypes}
+
+
+def usecols_for(cols: Iterable[str]):
+    # Callable form so a column missing from the file is skipped instead of raising
+    wanted = set(cols)
+    return lambda c: c in wanted
@@ -0,0 +1,383 @@
+import csv
+import io
+import shutil
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .compression import PARQUET_COMPRESSIONS, compression_of, open_raw, skip_to
+from .memory import ChunkSize, size_fn
+from .schema import CATEGORY_LEVELS, CLEAN_DTYPES, category_dtype, dtypes_for, usecols_for
+
+PARTITION_COLS = ["year", "month"]
+
+CSV_READERS = ["pandas", "pyarrow"]
+
+# Arrow read types for the schema dtypes, and the pandas dtypes they convert back to
+ARROW_TYPES = {
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "string": pa.string(),
+    "Int8": pa.int8(),
+    "Int16": pa.int16(),
+    "Int32": pa.int32(),
+    "Int64": pa.int64(),
+    "float32": pa.float32(),
+    "float64": pa.float64(),
+    "boolean": pa.bool_(),
+}
+ARROW_TO_PANDAS = {
+    pa.string(): pd.StringDtype(),
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+ARROW_BLOCK_SIZE = 16 << 20
+
+CLEAN_CSV_PATTERNS = ["*.csv", "*.csv.gz", "*.csv.zst"]
+
+
+def is_parquet_path(path: Path) -> bool:
+    if path.is_dir():
+        return next(path.rglob("*.parquet"), None) is not None
+    return path.suffix == ".parquet"
+
+
+def clean_csv_files(path: Path) -> list[Path]:
+    # A single cleaned CSV, or a directory of per-month cleaned CSVs (optionally compressed)
+    if not path.is_dir():
+        return [path]
+    return sorted(f for pattern in CLEAN_CSV_PATTERNS for f in path.glob(pattern))
+
+
+def _normalize_for_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    # Pin every column to its CLEAN_DTYPES type so all parts of the dataset share a schema
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        dtype = CLEAN_DTYPES.get(col, "string")
+        if col == "flight_date":
+            out[col] = pd.to_datetime(s, errors="coerce")
+        elif col in CATEGORY_LEVELS:
+            out[col] = s.astype(category_dtype(col))
+        elif dtype in ("category", "string"):
+            # Open-ended labels (cities, airports, ...) are stored as strings, which
+            # Parquet dictionary-encodes per file; readers get them back as categoricals
+            out[col] = s.astype("string")
+        elif dtype == "boolean":
+            out[col] = s.astype("boolean")
+        else:
+            out[col] = pd.to_numeric(s, errors="coerce").astype(dtype)
+    return pd.DataFrame(out, index=df.index)
+
+
+def write_parquet_part(df: pd.DataFrame, root: Path, part: int, compression: str = "none") -> None:
+    """
+    Write one cleaned chunk into a Hive-style dataset under root
+    (root/year=YYYY/month=M/part-NNNNN-*.parquet). `compression` is a
+    --compression choice; "none" keeps the snappy default.
+    """
+    table = pa.Table.from_pandas(_normalize_for_parquet(df), preserve_index=False)
+    # pandas picks int8/int16 codes by category count; use int32 everywhere so parts agree
+    table = table.cast(pa.schema([
+        pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type, f.type.ordered))
+        if pa.types.is_dictionary(f.type) else f
+        for f in table.schema
+    ], metadata=table.schema.metadata))
+    pq.write_to_dataset(
+        table,
+        root_path=str(root),
+        partition_cols=PARTITION_COLS,
+        basename_template=f"part-{part:05d}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        compression=PARQUET_COMPRESSIONS[compression],
+    )
+
+
+CsvSource = Union[Path, BinaryIO]
+
+
+def _csv_header(path: CsvSource) -> list[str]:
+    if hasattr(path, "read"):
+        if not path.seekable():
+            # Decompressing stream: look at the buffered bytes without consuming them
+            line = path.peek(1 << 16).split(b"\n", 1)[0].decode()
+            return next(csv.reader([line]))
+        line = path.readline().decode()
+        path.seek(0)
+        return next(csv.reader([line]))
+    with open(path, newline="") as f:
+        return next(csv.reader(f))
+
+
+def _rechunk(
+    batches: Iterable[pa.RecordBatch],
+    chunksize: ChunkSize,
+    to_pandas: Callable[[pa.Table], pd.DataFrame],
+) -> Iterator[pd.DataFrame]:
+    # Re-slice arbitrarily sized record batches into exact chunksize-row chunks
+    next_size = size_fn(chunksize)
+    pending: list[pa.RecordBatch] = []
+    rows = 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows and rows >= (n := next_size()):
+            table = pa.Table.from_batches(pending)
+            yield to_pandas(table.slice(0, n))
+            rest = table.slice(n)
+            pending = rest.to_batches()
+            rows = rest.num_rows
+    if rows:
+        yield to_pandas(pa.Table.from_batches(pending))
+
+
+def _arrow_csv_chunks(
+    path: CsvSource,
+    chunksize: ChunkSize,
+    columns: Optional[Sequence[str]],
+    dtypes: Dict[str, str],
+) -> Iterator[pd.DataFrame]:
+    header = _csv_header(path)
+    include = [c for c in header if columns is None or c in set(columns)]
+    types = {c: ARROW_TYPES[t] for c, t in dtypes.items() if c in include}
+    # Integer columns are parsed as float and cast after conversion, so "0.0"/"1.00"
+    # cells are accepted like pd.read_csv does (a fractional value still fails the cast)
+    ints = {c: t for c, t in types.items() if pa.types.is_integer(t)}
+    convert = pacsv.ConvertOptions(
+        column_types={c: pa.float64() if c in ints else t for c, t in types.items()},
+        include_columns=include,
+        strings_can_be_null=True,
+    )
+    read = pacsv.ReadOptions(use_threads=True, block_size=ARROW_BLOCK_SIZE)
+    stream = pacsv.open_csv(path, read_options=read, convert_options=convert)
+
+    def to_pandas(table: pa.Table) -> pd.DataFrame:
+        for c, t in ints.items():
+            i = table.schema.get_field_index(c)
+            table = table.set_column(i, c, table.column(i).cast(t))
+        return table.to_pandas(types_mapper=ARROW_TO_PANDAS.get)
+
+    yield from _rechunk(stream, chunksize, to_pandas)
+
+
+def iter_csv_chunks(
+    path: CsvSource,
+    chunksize: ChunkSize = 500_000,
+    columns: Optional[Sequence[str]] = None,
+    dtypes: Optional[Dict[str, str]] = None,
+    reader: str = "pandas",
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV as pandas chunks of `chunksize` rows. `chunksize` may be a
+    callable (e.g. a ChunkSizer), asked again before every chunk.
+
+    reader="pandas" uses pd.read_csv; reader="pyarrow" parses with
+    pyarrow.csv.open_csv and converts each chunk to pandas with the same
+    column subset and dtypes. Columns missing from the file are skipped.
+    .gz/.zst/.zip paths are decompressed on the fly (see compression.open_raw).
+    """
+    if isinstance(path, Path) and compression_of(path) is not None:
+        with open_raw(path) as f:
+            yield from iter_csv_chunks(f, chunksize, columns, dtypes, reader=reader)
+        return
+    dtypes = {} if dtypes is None else dtypes
+    if columns is not None:
+        dtypes = dtypes_for(dtypes, columns)
+    if reader == "pyarrow":
+        yield from _arrow_csv_chunks(path, chunksize, columns, dtypes)
+        return
+    next_size = size_fn(chunksize)
+    with pd.read_csv(
+        path,
+        iterator=True,
+        usecols=usecols_for(columns) if columns is not None else None,
+        dtype=dtypes,
+    ) as csv_reader:
+        while True:
+            try:
+                yield csv_reader.get_chunk(next_size())
+            except StopIteration:
+                return
+
+
+def iter_csv_blocks(path: Path, chunksize: ChunkSize, start_offset: int = 0) -> Iterator[Tuple[bytes, int]]:
+    """
+    Split a CSV into blocks of `chunksize` data lines, each prefixed with the
+    header line. Yields (block, end_offset) where end_offset is the byte
+    position right after the block, so a later run can seek straight to it.
+    Assumes no quoted field spans a line break (true for the BTS exports).
+    For compressed input offsets count decompressed bytes, and resuming
+    re-reads the stream up to start_offset.
+    """
+    with open_raw(path) as f:
+        header = f.readline()
+        if start_offset:
+            skip_to(f, start_offset)
+        next_size = size_fn(chunksize)
+        while True:
+            lines = list(islice(f, next_size()))
+            if not lines:
+                break
+            yield header + b"".join(lines), f.tell()
+
+
+def read_csv_block(
+    block: bytes,
+    columns: Optional[Sequence[str]] = None,
+    dtypes: Optional[Dict[str, str]] = None,
+    reader: str = "pandas",
+) -> pd.DataFrame:
+    rows = block.count(b"\n") + 1
+    return next(iter_csv_chunks(io.BytesIO(block), rows, columns, dtypes, reader=reader))
+
+
+def sort_plain(df: pd.DataFrame, keys: Sequence[str]) -> pd.DataFrame:
+    # Sort by the key values (not categorical code order), stable so ties keep input order
+    return df.sort_values(
+        list(keys),
+        kind="stable",
+        key=lambda s: s.astype(s.cat.categories.dtype) if isinstance(s.dtype, pd.CategoricalDtype) else s,
+    )
+
+
+def write_cluster_run(df: pd.DataFrame, stage_dir: Path, part: int) -> None:
+    # Spill one cleaned chunk into per-(year, month) staging files, pandas dtypes preserved
+    for (year, month), g in df.groupby(["year", "month"], sort=False, dropna=True):
+        d = stage_dir / f"year={year}" / f"month={month}"
+        d.mkdir(parents=True, exist_ok=True)
+        g.to_parquet(d / f"part-{part:05d}.parquet", index=False)
+
+
+def iter_clustered(stage_dir: Path, keys: Sequence[str]) -> Iterator[pd.DataFrame]:
+    """
+    Yield the staged rows one (year, month) bucket at a time, each sorted by
+    `keys`, in (year, month) order. Memory is bounded by the largest month.
+    """
+    def num(d: Path) -> int:
+        return int(d.name.split("=", 1)[1])
+
+    for ydir in sorted(stage_dir.glob("year=*"), key=num):
+        for mdir in sorted(ydir.glob("month=*"), key=num):
+            parts = [pd.read_parquet(f) for f in sorted(mdir.glob("*.parquet"))]
+            yield sort_plain(pd.concat(parts, ignore_index=True), keys)
+
+
+def reset_parquet_dataset(root: Path) -> None:
+    if root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+
+def remove_parquet_parts(root: Path, from_part: int) -> None:
+    # Drop files written by parts >= from_part (e.g. a part interrupted mid-write)
+    for f in root.rglob("part-*.parquet"):
+        if int(f.name.split("-")[1]) >= from_part:
+            f.unlink()
+
+
+def _categorical_scan_schema(schema: pa.Schema) -> pa.Schema:
+    # Scan "category" columns stored as plain strings as dictionaries -> pandas categoricals
+    fields = []
+    for f in schema:
+        is_text = pa.types.is_string(f.type) or pa.types.is_large_string(f.type)
+        if is_text and CLEAN_DTYPES.get(f.name) == "category":
+            f = pa.field(f.name, ARROW_TYPES["category"])
+        fields.append(f)
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def _partition_values(path: Path, root: Path) -> Dict[str, str]:
+    # year=2024/month=1/... -> {"year": "2024", "month": "1"}
+    return dict(p.split("=", 1) for p in path.relative_to(root).parent.parts if "=" in p)
+
+
+def partition_order(path: Path, root: Path) -> tuple:
+    # Numeric (year, month) order, so month=2 comes before month=10
+    values = _partition_values(path, root)
+    return (int(values.get("year", 0)), int(values.get("month", 0)), str(path))
+
+
+def prune_partitions(
+    files: Sequence[Path],
+    root: Path,
+    years: Optional[Sequence[int]] = None,
+    months: Optional[Sequence[int]] = None,
+) -> list[Path]:
+    """
+    Keep only the Parquet files whose year=/month= directories match, so the
+    other partitions are never opened. Files outside a partition directory
+    are kept (their rows are filtered while scanning).
+    """
+    wanted = {"year": years, "month": months}
+    keep = []
+    for f in files:
+        values = _partition_values(f, root)
+        if all(
+            allowed is None or key not in values or int(values[key]) in allowed
+            for key, allowed in wanted.items()
+        ):
+            keep.append(f)
+    return keep
+
+
+def _check_filter_column(key: str, columns, path: Path) -> None:
+    if key not in columns:
+        raise ValueError(f"cannot filter on {key}: no {key} column read from {path}")
+
+
+def iter_clean_chunks(
+    path: Path,
+    chunksize: ChunkSize = 500_000,
+    columns: Optional[Sequence[str]] = None,
+    months: Optional[Sequence[int]] = None,
+    reader: str = "pandas",
+    years: Optional[Sequence[int]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream the cleaned dataset as pandas chunks.
+
+    Reads either the cleaned CSV (one file or a directory of per-month
+    files) or the partitioned Parquet dataset. For Parquet only the
+    requested columns are decoded and year/month partitions outside
+    `years`/`months` are never opened; CSV rows are filtered after parsing.
+    `reader` picks the CSV backend. Filtering on a column that is not read
+    (or not in the data) is an error rather than a no-op.
+    """
+    if not is_parquet_path(path):
+        for csv_path in clean_csv_files(path):
+            for chunk in iter_csv_chunks(csv_path, chunksize, columns, CLEAN_DTYPES, reader=reader):
+                for key, allowed in [("month", months), ("year", years)]:
+                    if allowed is not None:
+                        _check_filter_column(key, chunk.columns, csv_path)
+                        chunk = chunk[chunk[key].isin(allowed)]
+                yield chunk
+        return
+
+    # Build from the .parquet files only so sidecar manifests in the tree are ignored
+    files = [path] if path.is_file() else sorted(path.rglob("*.parquet"), key=lambda f: partition_order(f, path))
+    if path.is_dir():
+        files = prune_partitions(files, path, years, months)
+    if not files:
+        return
+    files = [str(f) for f in files]
+    dataset = ds.dataset(files, format="parquet", partitioning="hive", partition_base_dir=str(path))
+    dataset = ds.dataset(files, format="parquet", partitioning="hive", partition_base_dir=str(path),
+                         schema=_categorical_scan_schema(dataset.schema))
+    flt = None
+    for key, allowed in [("year", years), ("month", months)]:
+        if allowed is not None:
+            _check_filter_column(key, dataset.schema.names, path)
+            cond = ds.field(key).isin(list(allowed))
+            flt = cond if flt is None else flt & cond
+    cols = [c for c in columns if c in dataset.schema.names] if columns is not None else None
+    batches = dataset.to_batches(columns=cols, filter=flt, batch_size=size_fn(chunksize)())
+    yield from _rechunk(batches, chunksize, lambda t: t.to_pandas())
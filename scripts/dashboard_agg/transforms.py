@@ -57,7 +57,7 @@ def ensure_columns(chunk: pd.DataFrame) -> pd.DataFrame:
     chunk["destination_state"] = chunk["destination_state"].replace(["nan", "None", "none", ""], pd.NA)
 
     # Raw cause text normalized
-    cause_raw = chunk["primary_delay_cause"].fillna("").astype(str).str.strip()
+    cause_raw = chunk["primary_delay_cause"].astype("string").fillna("").str.strip()
 
     # Turn weird placeholders into blank
     bad_tokens = {"", "nan", "none", "No Delay", "NO DELAY", "None"}
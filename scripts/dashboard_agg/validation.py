@@ -0,0 +1,147 @@
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .compression import raw_stem, write_csv
+from .constants import US_STATE_TO_ABBR
+
+# State names BTS uses besides the 50 states and DC (no map abbreviation, but valid)
+BTS_TERRITORIES = ["Puerto Rico", "U.S. Virgin Islands", "U.S. Pacific Trust Territories and Possessions"]
+KNOWN_STATES = sorted(set(US_STATE_TO_ABBR) | set(BTS_TERRITORIES))
+
+# At most a day early, at most three days late
+DELAY_RANGE = (-1440, 4320)
+CAUSE_RANGE = (0, 4320)
+CANCELLATION_CODES = ["A", "B", "C", "D"]
+
+# Rows missing any of these are dropped by process_chunk
+KEY_COLS = ["fl_date", "op_unique_carrier", "origin", "origin_state_nm"]
+HHMM_COLS = ["crs_dep_time", "crs_arr_time"]
+DELAY_COLS = ["dep_delay", "arr_delay"]
+CAUSE_COLS = ["carrier_delay", "weather_delay", "nas_delay", "security_delay", "late_aircraft_delay"]
+FLAG_COLS = ["cancelled", "diverted"]
+
+# Raw-chunk rules, in the order they are reported
+RULES = [
+    "missing_key",
+    "bad_date",
+    "bad_carrier",
+    "bad_airport",
+    "unknown_state",
+    "bad_hhmm",
+    "delay_range",
+    "cause_range",
+    "bad_flag",
+    "bad_cancellation_code",
+]
+
+QUARANTINE_DIR = "_quarantine"
+
+
+def quarantine_path(out_dir: Path, raw_path: Path) -> Path:
+    return out_dir / QUARANTINE_DIR / f"{raw_stem(raw_path)}.csv"
+
+
+def _bad_labels(s: pd.Series, is_valid: Callable[[pd.Series], pd.Series]) -> np.ndarray:
+    # Each distinct label is checked once and rows take their label's result; missing values pass
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes, labels = s.cat.codes.to_numpy(), s.cat.categories
+    else:
+        codes, labels = pd.factorize(s)
+    ok = np.append(is_valid(pd.Series(labels)).to_numpy(dtype=bool), True)
+    return ~ok[codes]
+
+
+def _outside(chunk: pd.DataFrame, cols: list[str], lo: float, hi: float) -> Optional[np.ndarray]:
+    cols = [c for c in cols if c in chunk.columns]
+    if not cols:
+        return None
+    v = chunk[cols].to_numpy(dtype="float64", na_value=np.nan)
+    return ((v < lo) | (v > hi)).any(axis=1)
+
+
+def _any(masks: list) -> Optional[np.ndarray]:
+    masks = [m for m in masks if m is not None]
+    return np.logical_or.reduce(masks) if masks else None
+
+
+def rule_masks(chunk: pd.DataFrame) -> Dict[str, np.ndarray]:
+    # One boolean mask per rule (True = row breaks it), for the rules whose columns are in the chunk
+    masks: Dict[str, Optional[np.ndarray]] = {}
+    has = chunk.columns.__contains__
+
+    masks["missing_key"] = _any([chunk[c].isna().to_numpy() for c in KEY_COLS if has(c)])
+
+    if has("fl_date"):
+        masks["bad_date"] = _bad_labels(
+            chunk["fl_date"], lambda s: pd.to_datetime(s, format="mixed", errors="coerce").notna()
+        )
+
+    if has("op_unique_carrier"):
+        masks["bad_carrier"] = _bad_labels(
+            chunk["op_unique_carrier"], lambda s: s.astype(str).str.fullmatch(r"[A-Z0-9]{2}")
+        )
+    masks["bad_airport"] = _any([
+        _bad_labels(chunk[c], lambda s: s.astype(str).str.fullmatch(r"[A-Z]{3}")) for c in ["origin", "dest"] if has(c)
+    ])
+    masks["unknown_state"] = _any([
+        _bad_labels(chunk[c], lambda s: s.astype(str).str.strip().isin(KNOWN_STATES))
+        for c in ["origin_state_nm", "dest_state_nm"] if has(c)
+    ])
+
+    hhmm = [c for c in HHMM_COLS if has(c)]
+    if hhmm:
+        v = chunk[hhmm].to_numpy(dtype="float64", na_value=np.nan)
+        bad = (v < 0) | (v > 2400) | (v % 100 >= 60) | (v != np.trunc(v))
+        masks["bad_hhmm"] = bad.any(axis=1)
+
+    masks["delay_range"] = _outside(chunk, DELAY_COLS, *DELAY_RANGE)
+    masks["cause_range"] = _outside(chunk, CAUSE_COLS, *CAUSE_RANGE)
+    masks["bad_flag"] = _outside(chunk, FLAG_COLS, 0, 1)
+    if has("cancellation_code"):
+        masks["bad_cancellation_code"] = _bad_labels(
+            chunk["cancellation_code"], lambda s: s.astype(str).str.strip().isin(CANCELLATION_CODES)
+        )
+    return {rule: masks[rule] for rule in RULES if masks.get(rule) is not None}
+
+
+def validate_chunk(chunk: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, int]]:
+    """
+    Split a raw chunk into valid rows and rejected rows. Rejected rows keep
+    their raw values plus a `quarantine_rules` column naming every rule they
+    break; counts are per rule, so a row may count more than once.
+    """
+    masks = rule_masks(chunk)
+    counts = {rule: int(m.sum()) for rule, m in masks.items()}
+    bad = _any(list(masks.values()))
+
+    if bad is None or not bad.any():
+        return chunk, chunk.iloc[:0], counts
+    rules = np.full(int(bad.sum()), "", dtype=object)
+    for rule, m in masks.items():
+        rules = rules + np.where(m[bad], rule + ";", "")
+    rejected = chunk[bad].assign(quarantine_rules=[r.rstrip(";") for r in rules])
+    return chunk[~bad], rejected, counts
+
+
+def write_quarantine(rejected: pd.DataFrame, path: Path, chunk_index: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    exists = path.exists()
+    write_csv(rejected.assign(chunk=chunk_index), path, header=not exists, append=exists)
+
+
+def trim_quarantine(path: Path, start_index: int) -> None:
+    # On resume, drop rows quarantined by chunks that are about to be redone
+    if not path.exists():
+        return
+    if start_index == 0:
+        path.unlink()
+        return
+    q = pd.read_csv(path, dtype=str, keep_default_na=False)
+    q = q[q["chunk"].astype(int) < start_index]
+    if q.empty:
+        path.unlink()
+    else:
+        write_csv(q, path)
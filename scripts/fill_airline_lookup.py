@@ -1,33 +1,17 @@
 from pathlib import Path
 import pandas as pd
 
-CODE_TO_NAME = {
-    "9E": "Endeavor Air",
-    "AA": "American Airlines",
-    "AS": "Alaska Airlines",
-    "B6": "JetBlue Airways",
-    "DL": "Delta Air Lines",
-    "F9": "Frontier Airlines",
-    "G4": "Allegiant Air",
-    "HA": "Hawaiian Airlines",
-    "MQ": "Envoy Air",
-    "NK": "Spirit Airlines",
-    "OH": "PSA Airlines",
-    "OO": "SkyWest Airlines",
-    "UA": "United Airlines",
-    "WN": "Southwest Airlines",
-    "YX": "Republic Airways",
-}
+from dashboard_agg.lookups import fill_airline_names
+from dashboard_agg.schema import FILL_AIRLINE_COLS, LOOKUP_AIRLINE_DTYPES, usecols_for
 
 path = Path("data/lookups/airlines.csv")
-df = pd.read_csv(path)
+df = pd.read_csv(path, usecols=usecols_for(FILL_AIRLINE_COLS), dtype=LOOKUP_AIRLINE_DTYPES)
 
 df["operating_airline"] = df["operating_airline"].astype(str).str.strip()
 df["airline_name"] = df.get("airline_name", "").astype(str).str.strip()
 
-# fill blanks from mapping
-mask_blank = df["airline_name"].isin(["", "nan", "None"])
-df.loc[mask_blank, "airline_name"] = df.loc[mask_blank, "operating_airline"].map(CODE_TO_NAME).fillna("")
+# fill blanks from the curated mapping
+df = fill_airline_names(df)
 
 missing = df[df["airline_name"].eq("")]["operating_airline"].tolist()
 if missing:
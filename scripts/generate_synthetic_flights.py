@@ -0,0 +1,209 @@
+import argparse
+import calendar
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dashboard_agg.compression import csv_name, raw_stem, write_csv
+
+# Columns resampled together so carrier/airport/route/hour combinations stay realistic
+SCHEDULE_COLS = [
+    "op_unique_carrier",
+    "origin", "origin_city_name", "origin_state_nm",
+    "dest", "dest_city_name", "dest_state_nm",
+    "crs_dep_time", "crs_arr_time", "crs_elapsed_time", "distance",
+]
+
+# Columns resampled together so delays, causes, cancellations and null patterns stay consistent
+OUTCOME_COLS = [
+    "cancelled", "cancellation_code", "diverted",
+    "dep_delay", "taxi_out", "taxi_in", "arr_delay",
+    "carrier_delay", "weather_delay", "nas_delay", "security_delay", "late_aircraft_delay",
+]
+
+DTYPE_FORMATS = {"Int64": "int", "int64": "int", "float64": "float", "object": "str", "datetime64[ns]": "date"}
+
+
+def hhmm_to_minutes(hhmm: np.ndarray) -> np.ndarray:
+    return (hhmm // 100) * 60 + hhmm % 100
+
+
+def minutes_to_hhmm(minutes: np.ndarray) -> np.ndarray:
+    # BTS clock times run 0001..2400
+    m = np.mod(minutes, 1440)
+    hhmm = (m // 60) * 100 + m % 60
+    return np.where(hhmm == 0, 2400, hhmm)
+
+
+def learn_profile(sample: pd.DataFrame, year: int) -> dict:
+    """
+    Empirical distributions from the raw sample: schedule rows, outcome rows
+    (plus the gaps between scheduled and actual clock times), flight number
+    ranges per carrier and the share of flights per month.
+    """
+    schedule = sample[SCHEDULE_COLS].reset_index(drop=True)
+    outcome = sample[OUTCOME_COLS].reset_index(drop=True)
+
+    # Minutes from scheduled to actual clock time (wraps around midnight)
+    def offset(actual, scheduled):
+        diff = hhmm_to_minutes(sample[actual].to_numpy(float)) - hhmm_to_minutes(sample[scheduled].to_numpy(float))
+        return (diff + 720) % 1440 - 720
+    outcome["dep_offset"] = offset("dep_time", "crs_dep_time")
+    outcome["arr_offset"] = offset("arr_time", "crs_arr_time")
+    outcome["elapsed_delta"] = (sample["actual_elapsed_time"] - sample["crs_elapsed_time"]).to_numpy()
+
+    fl_max = sample.groupby("op_unique_carrier")["op_carrier_fl_num"].max()
+
+    months = sample["month"].value_counts(normalize=True).reindex(range(1, 13), fill_value=0)
+    dates = pd.date_range(f"{year}-01-01", f"{year}-12-31", freq="D")
+    days_in_month = np.array([calendar.monthrange(year, m)[1] for m in range(1, 13)])
+    date_weights = months.to_numpy()[dates.month - 1] / days_in_month[dates.month - 1]
+
+    return {
+        "schedule": schedule,
+        "outcome": outcome,
+        "fl_max": fl_max,
+        "dates": dates,
+        "date_weights": date_weights / date_weights.sum(),
+    }
+
+
+def generate_chunk(profile: dict, n: int, rng: np.random.Generator) -> pd.DataFrame:
+    sched = profile["schedule"].iloc[rng.integers(0, len(profile["schedule"]), n)].reset_index(drop=True)
+    out = profile["outcome"].iloc[rng.integers(0, len(profile["outcome"]), n)].reset_index(drop=True)
+    dates = profile["dates"][rng.choice(len(profile["dates"]), n, p=profile["date_weights"])]
+
+    df = pd.DataFrame({
+        "year": dates.year,
+        "month": dates.month,
+        "day_of_month": dates.day,
+        "day_of_week": dates.dayofweek + 1,
+        "fl_date": dates.strftime("%Y-%m-%d"),
+    })
+    for col in SCHEDULE_COLS:
+        df[col] = sched[col].to_numpy()
+
+    # Shift the schedule by up to +-15 minutes in 5-minute steps so rows are not exact copies
+    jitter = rng.integers(-3, 4, n) * 5
+    crs_dep = hhmm_to_minutes(sched["crs_dep_time"].to_numpy()) + jitter
+    crs_arr = hhmm_to_minutes(sched["crs_arr_time"].to_numpy()) + jitter
+    df["crs_dep_time"] = minutes_to_hhmm(crs_dep)
+    df["crs_arr_time"] = minutes_to_hhmm(crs_arr)
+
+    fl_max = profile["fl_max"].reindex(df["op_unique_carrier"]).to_numpy()
+    df["op_carrier_fl_num"] = np.floor(rng.random(n) * fl_max) + 1
+
+    dep_time = crs_dep + out["dep_offset"].to_numpy()
+    arr_time = crs_arr + out["arr_offset"].to_numpy()
+    taxi_out = out["taxi_out"].to_numpy()
+    taxi_in = out["taxi_in"].to_numpy()
+    actual_elapsed = df["crs_elapsed_time"].to_numpy() + out["elapsed_delta"].to_numpy()
+
+    df["dep_time"] = minutes_to_hhmm(dep_time)
+    df["dep_delay"] = out["dep_delay"].to_numpy()
+    df["taxi_out"] = taxi_out
+    df["wheels_off"] = minutes_to_hhmm(dep_time + taxi_out)
+    df["wheels_on"] = minutes_to_hhmm(arr_time - taxi_in)
+    df["taxi_in"] = taxi_in
+    df["arr_time"] = minutes_to_hhmm(arr_time)
+    df["arr_delay"] = out["arr_delay"].to_numpy()
+    for col in ["cancelled", "cancellation_code", "diverted"]:
+        df[col] = out[col].to_numpy()
+    df["actual_elapsed_time"] = actual_elapsed
+    df["air_time"] = np.maximum(actual_elapsed - taxi_out - taxi_in, 10)
+    for col in ["carrier_delay", "weather_delay", "nas_delay", "security_delay", "late_aircraft_delay"]:
+        df[col] = out[col].to_numpy()
+
+    # Carry the sample's null patterns over (NaN arithmetic already covers most of them)
+    df.loc[out["taxi_out"].isna(), "wheels_off"] = np.nan
+    df.loc[out["taxi_in"].isna(), "wheels_on"] = np.nan
+    df.loc[out["dep_offset"].isna(), "dep_time"] = np.nan
+    df.loc[out["arr_offset"].isna(), "arr_time"] = np.nan
+    df.loc[out["arr_delay"].isna(), "air_time"] = np.nan
+    return df
+
+
+def apply_dictionary(df: pd.DataFrame, dictionary: pd.DataFrame) -> pd.DataFrame:
+    # Column order and value types from flight_data_2024_data_dictionary.csv
+    missing = [c for c in dictionary["column"] if c not in df.columns]
+    if missing:
+        raise ValueError(f"generator does not produce dictionary columns: {missing}")
+    out = {}
+    for col, dtype in zip(dictionary["column"], dictionary["dtype"]):
+        kind = DTYPE_FORMATS.get(dtype)
+        if kind is None:
+            raise ValueError(f"unsupported dtype {dtype!r} for {col} in the data dictionary")
+        s = df[col]
+        if kind == "int":
+            out[col] = s.astype("int64")
+        elif kind == "float":
+            out[col] = s.astype("float64")
+        else:
+            out[col] = s
+    return pd.DataFrame(out)
+
+
+def generate(
+    sample_csv: Path,
+    dictionary_csv: Path,
+    out_path: Path,
+    rows: int,
+    year: int = 2024,
+    seed: int = 42,
+    chunk_rows: int = 500_000,
+    compression: str = "none",
+) -> Path:
+    sample = pd.read_csv(sample_csv)
+    dictionary = pd.read_csv(dictionary_csv)
+    profile = learn_profile(sample, year)
+    rng = np.random.default_rng(seed)
+
+    # flights.2024.sample.csv.gz -> flights.2024.sample + the suffix of `compression`
+    out_path = out_path.with_name(csv_name(raw_stem(out_path), compression))
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    while written < rows:
+        n = min(chunk_rows, rows - written)
+        chunk = apply_dictionary(generate_chunk(profile, n, rng), dictionary)
+        write_csv(chunk, out_path, compression, header=(written == 0), append=(written > 0))
+        written += n
+    return out_path
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a synthetic raw flight file shaped like the BTS export")
+    ap.add_argument("--sample", default="data/raw/flight_data_2024_sample.csv",
+                    help="Raw sample the distributions are learned from")
+    ap.add_argument("--dictionary", default="data/raw/flight_data_2024_data_dictionary.csv")
+    ap.add_argument("--out", default="data/raw/flight_data_synthetic.csv")
+    ap.add_argument("--rows", type=int, default=None, help="Rows to generate")
+    ap.add_argument("--scale", type=float, default=None, help="Rows as a multiple of the sample size")
+    ap.add_argument("--year", type=int, default=2024)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--chunk-rows", type=int, default=500_000)
+    ap.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none")
+    args = ap.parse_args()
+
+    if (args.rows is None) == (args.scale is None):
+        ap.error("give exactly one of --rows or --scale")
+    rows = args.rows
+    if rows is None:
+        with open(args.sample, "rb") as f:
+            rows = int(round((sum(1 for _ in f) - 1) * args.scale))
+
+    out = generate(
+        Path(args.sample),
+        Path(args.dictionary),
+        Path(args.out),
+        rows,
+        year=args.year,
+        seed=args.seed,
+        chunk_rows=args.chunk_rows,
+        compression=args.compression,
+    )
+    print(f"Wrote {rows:,} synthetic rows to: {out}")
+
+
+if __name__ == "__main__":
+    main()
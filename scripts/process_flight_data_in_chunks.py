@@ -1,8 +1,71 @@
 import argparse
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
 import pandas as pd
 import numpy as np
 
+from dashboard_agg.checkpoint import (
+    check_resumable,
+    load_manifest,
+    manifest_path,
+    new_manifest,
+    record_chunk,
+    resume_point,
+    save_manifest,
+)
+from dashboard_agg.compression import (
+    OUTPUT_COMPRESSIONS,
+    csv_name,
+    raw_stem,
+    record_parquet_sizes,
+    report_io_savings,
+    with_csv_suffix,
+    write_csv,
+)
+from dashboard_agg.dedup import DEDUP_RAW_KEYS, KeyIndex, drop_duplicate_flights, keys_path, load_keys, save_keys
+from dashboard_agg.ingest import (
+    check_output_names,
+    discover_raw_files,
+    is_multi_raw,
+    load_ingest_manifest,
+    manifest_key,
+    plan_ingest,
+    record_ingested,
+    save_ingest_manifest,
+    stale_entries,
+)
+from dashboard_agg.lookups import LookupCollector
+from dashboard_agg.memory import ETL_WORKING_FACTOR, make_chunksize, observe_chunks, parse_size, report_peak_rss
+from dashboard_agg.pipeline import Accumulators, cube_frames, update_tables, write_tables
+from dashboard_agg.profiling import DISABLED, Profiler
+from dashboard_agg.schema import (
+    CATEGORY_LEVELS,
+    CLUSTER_KEYS,
+    DELAY_BUCKET_LABELS,
+    ETL_PROFILES,
+    LOOKUP_AIRLINE_COLS,
+    LOOKUP_AIRPORT_COLS,
+    RAW_DTYPES,
+    TABLES_COLS,
+    category_dtype,
+)
+from dashboard_agg.validation import quarantine_path, trim_quarantine, validate_chunk, write_quarantine
+from dashboard_agg.storage import (
+    CSV_READERS,
+    iter_csv_blocks,
+    iter_csv_chunks,
+    iter_clustered,
+    read_csv_block,
+    remove_parquet_parts,
+    reset_parquet_dataset,
+    write_cluster_run,
+    write_parquet_part,
+)
+
 US_STATE_TO_ABBR = {
     "Alabama":"AL","Alaska":"AK","Arizona":"AZ","Arkansas":"AR","California":"CA","Colorado":"CO",
     "Connecticut":"CT","Delaware":"DE","District of Columbia":"DC","Florida":"FL","Georgia":"GA",
@@ -15,13 +78,55 @@ US_STATE_TO_ABBR = {
     "Wisconsin":"WI","Wyoming":"WY"
 }
 
+# "HH:MM" label for every HHMM integer in 0..9999, indexed by the integer itself
+HHMM_LABELS = np.array([f"{v // 100:02d}:{v % 100:02d}" for v in range(10_000)], dtype=object)
+
+CAUSE_LABELS = {
+    "carrier_delay_min": "Carrier",
+    "weather_delay_min": "Weather",
+    "nas_delay_min": "NAS",
+    "security_delay_min": "Security",
+    "late_aircraft_delay_min": "Late Aircraft",
+}
+
+def hhmm_to_int(series: pd.Series) -> pd.Series:
+    # Truncate to int HHMM; anything outside 0..9999 is treated as missing
+    v = np.trunc(pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64", na_value=np.nan))
+    v[(v < 0) | (v >= 10_000)] = np.nan
+    return pd.Series(v, index=series.index).astype("Int64")
+
 def hhmm_to_hour_min(series: pd.Series):
-    s = series.apply(lambda x: np.nan if pd.isna(x) else str(int(float(x))).zfill(4))
-    hour = s.apply(lambda x: np.nan if pd.isna(x) else int(x[:2])).astype("Int64")
-    minute = s.apply(lambda x: np.nan if pd.isna(x) else int(x[2:])).astype("Int64")
+    v = hhmm_to_int(series)
+    hour = v // 100
+    minute = v % 100
     return hour, minute
 
-def process_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+def hhmm_int_to_label(v: pd.Series) -> pd.Series:
+    valid = v.notna().to_numpy()
+    out = np.full(len(v), np.nan, dtype=object)
+    out[valid] = HHMM_LABELS[v.to_numpy(dtype="int64", na_value=0)[valid]]
+    return pd.Series(out, index=v.index)
+
+def primary_cause(chunk: pd.DataFrame, cause_cols: list[str], total: pd.Series) -> np.ndarray:
+    if not cause_cols:
+        return np.full(len(chunk), "No Delay", dtype=object)
+    labels = np.array([CAUSE_LABELS[c] for c in cause_cols], dtype=object)
+    values = chunk[cause_cols].to_numpy(dtype="float64")
+    # argmax picks the first maximum, same tie-break as idxmax(axis=1)
+    return np.where(total.to_numpy() > 0, labels[values.argmax(axis=1)], "No Delay")
+
+def process_chunk(chunk: pd.DataFrame, column_profile: str = "default") -> pd.DataFrame:
+    raw_cols = ETL_PROFILES[column_profile]["raw"]
+    clean_cols = ETL_PROFILES[column_profile]["clean"]
+    # Derived columns the profile writes (None = all of them)
+    want = set(clean_cols) if clean_cols is not None else None
+
+    def wanted(col: str) -> bool:
+        return want is None or col in want
+
+    # Keep only the profile's raw columns (a no-op when the read was already pruned)
+    chunk = chunk[[c for c in chunk.columns if c in raw_cols]]
+
     # Rename columns
     rename_map = {
         "fl_date": "flight_date",
@@ -50,19 +155,16 @@ def process_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
 
         "cancelled": "is_cancelled",
         "diverted": "is_diverted",
+
+        "distance": "distance_miles",
+        "taxi_out": "taxi_out_min",
+        "taxi_in": "taxi_in_min",
+        "air_time": "air_time_min",
+        "crs_elapsed_time": "scheduled_elapsed_min",
+        "actual_elapsed_time": "actual_elapsed_min",
     }
     chunk = chunk.rename(columns={k: v for k, v in rename_map.items() if k in chunk.columns})
 
-    # Drop unnecessary columns
-    drop_cols = [
-        "operating_flight_number",
-        "dep_time","arr_time","wheels_off","wheels_on","taxi_out","taxi_in",
-        "air_time","distance","crs_elapsed_time","actual_elapsed_time",
-        "cancellation_code",
-        "year","month","day_of_month","day_of_week"
-    ]
-    chunk = chunk.drop(columns=[c for c in drop_cols if c in chunk.columns])
-
     # Type fixes
     chunk["flight_date"] = pd.to_datetime(chunk["flight_date"], errors="coerce")
 
@@ -82,18 +184,19 @@ def process_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
     chunk["year"] = chunk["flight_date"].dt.year.astype("Int64")
     chunk["month"] = chunk["flight_date"].dt.month.astype("Int64")
     chunk["month_name"] = chunk["flight_date"].dt.month_name()
-    chunk["day_of_month"] = chunk["flight_date"].dt.day.astype("Int64")
-    chunk["day_of_week_name"] = chunk["flight_date"].dt.day_name()
-    chunk["week_of_year"] = chunk["flight_date"].dt.isocalendar().week.astype("Int64")
+    if wanted("day_of_month"):
+        chunk["day_of_month"] = chunk["flight_date"].dt.day.astype("Int64")
+    if wanted("day_of_week_name"):
+        chunk["day_of_week_name"] = chunk["flight_date"].dt.day_name()
+    if wanted("week_of_year"):
+        chunk["week_of_year"] = chunk["flight_date"].dt.isocalendar().week.astype("Int64")
 
     # Scheduled departure parsing
     if "scheduled_departure_hhmm" in chunk.columns:
-        h, m = hhmm_to_hour_min(chunk["scheduled_departure_hhmm"])
-        chunk["scheduled_departure_hour"] = h
-        chunk["scheduled_departure_time"] = [
-            np.nan if pd.isna(hh) or pd.isna(mm) else f"{int(hh):02d}:{int(mm):02d}"
-            for hh, mm in zip(h.tolist(), m.tolist())
-        ]
+        hhmm = hhmm_to_int(chunk["scheduled_departure_hhmm"])
+        chunk["scheduled_departure_hour"] = hhmm // 100
+        if wanted("scheduled_departure_time"):
+            chunk["scheduled_departure_time"] = hhmm_int_to_label(hhmm)
 
     # State abbreviations for Plotly maps
     if "origin_state" in chunk.columns:
@@ -102,67 +205,413 @@ def process_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
 
     if "destination_state" in chunk.columns:
         chunk["destination_state"] = chunk["destination_state"].astype(str).str.strip()
-        chunk["destination_state_abbr"] = chunk["destination_state"].map(US_STATE_TO_ABBR)
+        if wanted("destination_state_abbr"):
+            chunk["destination_state_abbr"] = chunk["destination_state"].map(US_STATE_TO_ABBR)
 
     # Engineered delay metrics
-    cause_cols = [
-        "carrier_delay_min","weather_delay_min","nas_delay_min","security_delay_min","late_aircraft_delay_min"
-    ]
-    cause_cols = [c for c in cause_cols if c in chunk.columns]  # safety
+    cause_cols = [c for c in CAUSE_LABELS if c in chunk.columns]  # safety
 
     chunk["is_operated"] = True
     if "is_cancelled" in chunk.columns and "is_diverted" in chunk.columns:
-        chunk["is_operated"] = (chunk["is_cancelled"] == 0) & (chunk["is_diverted"] == 0)
+        # Flags are nullable Int8: a missing flag means not operated, as with the float columns before
+        chunk["is_operated"] = ((chunk["is_cancelled"] == 0) & (chunk["is_diverted"] == 0)).fillna(False)
 
     chunk["arrival_delay_min"] = chunk["arrival_delay_raw_min"].clip(lower=0)
     chunk["departure_delay_min"] = chunk["departure_delay_raw_min"].clip(lower=0)
-    chunk["is_delayed_15"] = chunk["is_operated"] & (chunk["arrival_delay_raw_min"] > 15)
+    chunk["is_delayed_15"] = chunk["is_operated"] & (chunk["arrival_delay_raw_min"] > 15).fillna(False)
 
     chunk["total_delay_min"] = chunk[cause_cols].sum(axis=1) if cause_cols else 0
 
-    bins = [-1, 15, 30, 60, 120, 10_000]
-    labels = ["On time (≤15)", "16–30", "31–60", "61–120", "120+"]
-    chunk["delay_bucket"] = pd.cut(chunk["arrival_delay_raw_min"].clip(lower=-1), bins=bins, labels=labels)
+    if wanted("delay_bucket"):
+        bins = [-1, 15, 30, 60, 120, 10_000]
+        chunk["delay_bucket"] = pd.cut(
+            chunk["arrival_delay_raw_min"].clip(lower=-1), bins=bins, labels=DELAY_BUCKET_LABELS
+        )
 
-    cause_label = {
-        "carrier_delay_min": "Carrier",
-        "weather_delay_min": "Weather",
-        "nas_delay_min": "NAS",
-        "security_delay_min": "Security",
-        "late_aircraft_delay_min": "Late Aircraft",
-    }
+    chunk["primary_delay_cause"] = primary_cause(chunk, cause_cols, chunk["total_delay_min"])
 
-    if cause_cols:
-        max_cause = chunk[cause_cols].idxmax(axis=1)
-        chunk["primary_delay_cause"] = np.where(
-            chunk["total_delay_min"] > 0,
-            max_cause.map(cause_label),
-            "No Delay"
-        )
-    else:
-        chunk["primary_delay_cause"] = "No Delay"
+    if wanted("country"):
+        chunk["country"] = "United States"
 
-    chunk["country"] = "United States"
+    if "operating_flight_number" in chunk.columns:
+        chunk["operating_flight_number"] = chunk["operating_flight_number"].round().astype("Int32")
+
+    # Repeated labels as categoricals with fixed code tables
+    for col in CATEGORY_LEVELS:
+        if col in chunk.columns:
+            chunk[col] = chunk[col].astype(category_dtype(col))
+    for col in ["origin_city", "origin_state", "destination_city", "destination_state", "cancellation_code"]:
+        if col in chunk.columns:
+            chunk[col] = chunk[col].astype("category")
+    chunk["is_operated"] = chunk["is_operated"].astype(bool)
+    chunk["is_delayed_15"] = chunk["is_delayed_15"].astype(bool)
+    if clean_cols is not None:
+        chunk = chunk[clean_cols]
     return chunk
 
+def iter_processed(
+    chunks: Iterable[pd.DataFrame],
+    workers: int = 1,
+    prof: Profiler = DISABLED,
+    start: int = 0,
+    column_profile: str = "default",
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield process_chunk(chunk, column_profile) for each input chunk, in input order.
+
+    With workers > 1 chunks are transformed in a process pool. At most
+    2 * workers chunks are in flight; reading pauses until the oldest one
+    has been handed back to the caller, so memory stays bounded when the
+    writer is slower than the pool. When profiled, pool mode records the
+    time spent waiting for each result rather than the transform itself.
+    """
+    if workers <= 1:
+        for i, chunk in enumerate(chunks, start=start):
+            with prof.stage("process_chunk", len(chunk), i):
+                cleaned = process_chunk(chunk, column_profile)
+            yield cleaned
+        return
+
+    max_pending = 2 * workers
+    pending = deque()
+    done = start
+
+    def _next_result() -> pd.DataFrame:
+        nonlocal done
+        with prof.stage("process_chunk_wait", chunk=done) as info:
+            cleaned = pending.popleft().result()
+            info["rows"] = len(cleaned)
+        done += 1
+        return cleaned
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunks:
+            pending.append(pool.submit(process_chunk, chunk, column_profile))
+            if len(pending) >= max_pending:
+                yield _next_result()
+        while pending:
+            yield _next_result()
+
+def run_file(
+    raw_path: Path,
+    out_path: Optional[Path],
+    args: argparse.Namespace,
+    accs: Optional[Accumulators] = None,
+    prof: Profiler = DISABLED,
+    index: Optional[KeyIndex] = None,
+    lookups: Optional[LookupCollector] = None,
+) -> Optional[np.ndarray]:
+    """
+    Clean one raw CSV into out_path (CSV file or Parquet dataset directory),
+    honouring --workers/--reader/--checkpoint/--resume.
+
+    If accs is given every cleaned chunk is also folded into the dashboard
+    cube accumulators (fused mode); out_path may then be None to skip
+    writing the clean dataset altogether. If lookups is given, the airlines
+    and airports of every cleaned chunk are collected into it as well.
+
+    With --cluster, chunks are first spilled into per-month staging files,
+    then each month is sorted by CLUSTER_KEYS and written out in order.
+
+    Raw rows breaking a validation rule (see dashboard_agg.validation) are
+    moved to <out dir>/_quarantine/<raw stem>.csv unless --no-validate.
+
+    With --dedup, rows whose DEDUP_RAW_KEYS were already seen in this file or
+    are in `index` (flights from other files) are dropped before they are
+    transformed; returns the key hashes of the rows kept.
+    """
+    checkpoint = args.checkpoint or args.resume
+    manifest_file = manifest_path(out_path) if checkpoint else None
+    manifest = None
+    start_index, start_offset = 0, 0
+
+    if checkpoint:
+        expected = new_manifest(raw_path, out_path, args.format, args.chunksize, args.columns)
+        manifest = load_manifest(manifest_file) if args.resume else None
+        if manifest is None:
+            manifest = expected
+        else:
+            check_resumable(manifest, expected)
+            if manifest["complete"]:
+                print(f"Nothing to do. {out_path} is already complete.")
+                return None
+            start_index, start_offset, out_bytes = resume_point(manifest)
+            print(f"Resuming at chunk {start_index} (raw byte {start_offset:,})")
+            # Roll the output back to the last committed chunk
+            if args.format == "parquet":
+                remove_parquet_parts(out_path, start_index)
+            elif out_path.exists():
+                os.truncate(out_path, out_bytes)
+        save_manifest(manifest_file, manifest)
+
+    if out_path is not None and start_index == 0 and args.format == "parquet":
+        reset_parquet_dataset(out_path)
+
+    # Pool mode keeps up to 2 * workers chunks in flight plus the one being read
+    in_flight = 2 * args.workers + 1 if args.workers > 1 else 1
+    chunksize = make_chunksize(args.chunksize, args.memory_budget, ETL_WORKING_FACTOR, in_flight, raw_path.name)
+
+    # Only the profile's raw columns are parsed at all (plus the flight key when deduplicating)
+    raw_cols = ETL_PROFILES[args.columns]["raw"]
+    if args.dedup:
+        raw_cols = raw_cols + [k for k in DEDUP_RAW_KEYS if k not in raw_cols]
+    raw_offsets = deque()
+    if checkpoint:
+        # Line-block reader so every chunk carries the raw byte offset it ends at
+        def _blocks():
+            for block, end in iter_csv_blocks(raw_path, chunksize, start_offset):
+                raw_offsets.append(end)
+                yield read_csv_block(block, raw_cols, RAW_DTYPES, reader=args.reader)
+        reader = _blocks()
+    else:
+        reader = iter_csv_chunks(raw_path, chunksize, raw_cols, RAW_DTYPES, reader=args.reader)
+    reader = prof.timed_iter("read", observe_chunks(reader, chunksize), start=start_index)
+    prof.scope = raw_path.name
+
+    rule_counts: dict = {}
+    if args.validate:
+        side_dir = out_path.parent if out_path is not None else Path(args.cubes_out or args.lookups_out)
+        qpath = quarantine_path(side_dir, raw_path)
+        trim_quarantine(qpath, start_index)
+
+        def _validate(chunks):
+            for i, chunk in enumerate(chunks, start=start_index):
+                with prof.stage("validate", len(chunk), i):
+                    chunk, rejected, counts = validate_chunk(chunk)
+                    if len(rejected):
+                        write_quarantine(rejected, qpath, i)
+                for rule, n in counts.items():
+                    rule_counts[rule] = rule_counts.get(rule, 0) + n
+                    prof.count(f"validate:{rule}", n)
+                yield chunk
+        reader = _validate(reader)
+
+    kept_keys, dropped = [], 0
+    if args.dedup:
+        seen = index if index is not None else KeyIndex()
+
+        def _dedup(chunks):
+            nonlocal dropped
+            for i, chunk in enumerate(chunks, start=start_index):
+                with prof.stage("dedup", len(chunk), i):
+                    chunk, kept, n = drop_duplicate_flights(chunk, seen)
+                kept_keys.append(kept)
+                dropped += n
+                prof.count("dedup:dropped", n)
+                yield chunk
+        reader = _dedup(reader)
+
+    stage_dir = None
+    if args.cluster and out_path is not None:
+        stage_dir = out_path.with_name(out_path.name + ".staging")
+        shutil.rmtree(stage_dir, ignore_errors=True)
+
+    processed = iter_processed(reader, workers=args.workers, prof=prof, start=start_index, column_profile=args.columns)
+    for i, cleaned in enumerate(processed, start=start_index):
+        out_bytes = 0
+        with prof.stage("write", len(cleaned), i):
+            if out_path is None:
+                pass
+            elif stage_dir is not None:
+                write_cluster_run(cleaned, stage_dir, part=i)
+            elif args.format == "parquet":
+                write_parquet_part(cleaned, out_path, part=i, compression=args.compression)
+            else:
+                out_bytes = write_csv(
+                    cleaned, out_path, args.compression, header=(i == 0), append=(i > 0), durable=checkpoint
+                )
+
+        if accs is not None:
+            # Same column projection build_tables reads from the clean file
+            update_tables(accs, cleaned[[c for c in TABLES_COLS if c in cleaned.columns]], prof, chunk_index=i)
+        if lookups is not None:
+            lookups.update(cleaned, prof, chunk_index=i)
+
+        if checkpoint:
+            with prof.stage("checkpoint", chunk=i):
+                record_chunk(manifest, i, len(cleaned), raw_offsets.popleft(), out_bytes)
+                save_manifest(manifest_file, manifest)
+
+    if args.validate and qpath.exists():
+        broken = ", ".join(f"{rule} {n:,}" for rule, n in rule_counts.items() if n)
+        print(f"{raw_path.name}: quarantined rows breaking {broken} -> {qpath}")
+    if args.dedup:
+        print(f"{raw_path.name}: dropped {dropped:,} duplicate flights")
+    if stage_dir is not None:
+        write_clustered(stage_dir, out_path, args, prof)
+    if checkpoint:
+        manifest["complete"] = True
+        save_manifest(manifest_file, manifest)
+    if out_path is not None and args.format == "parquet":
+        record_parquet_sizes(out_path)
+    if not args.dedup:
+        return None
+    return np.concatenate(kept_keys) if kept_keys else np.empty(0, dtype=np.uint64)
+
+def write_clustered(stage_dir: Path, out_path: Path, args: argparse.Namespace, prof: Profiler = DISABLED) -> None:
+    # Months come out in (year, month) order, each sorted, so the whole output is sorted by CLUSTER_KEYS
+    if not stage_dir.exists():
+        return
+    for part, month in enumerate(iter_clustered(stage_dir, CLUSTER_KEYS)):
+        with prof.stage("cluster", len(month)):
+            if args.format == "parquet":
+                write_parquet_part(month, out_path, part=part, compression=args.compression)
+            else:
+                write_csv(month, out_path, args.compression, header=(part == 0), append=(part > 0))
+    shutil.rmtree(stage_dir)
+
+
+def remove_output(out_path: Path) -> None:
+    if out_path.is_dir():
+        shutil.rmtree(out_path)
+    else:
+        out_path.unlink(missing_ok=True)
+    manifest_path(out_path).unlink(missing_ok=True)
+
+
+def run_many(
+    raw_spec: str,
+    out_dir: Path,
+    args: argparse.Namespace,
+    prof: Profiler = DISABLED,
+    lookups: Optional[LookupCollector] = None,
+) -> None:
+    # One output per raw file; only new or changed files are processed
+    files = discover_raw_files(raw_spec)
+    if not files:
+        raise ValueError(f"no raw files match {raw_spec}")
+    check_output_names(files)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ingest = load_ingest_manifest(out_dir)
+    todo = plan_ingest(
+        files, ingest, column_profile=args.columns, dedup=args.dedup,
+        fmt=args.format, compression=args.compression,
+    )
+    save_ingest_manifest(out_dir, ingest)
+
+    index = None
+    if args.dedup:
+        # Flights already contributed by the files that stay as they are
+        todo_keys = {manifest_key(path) for path, _, _ in todo}
+        index = KeyIndex()
+        for key in ingest["files"]:
+            if key not in todo_keys:
+                index.add(load_keys(keys_path(out_dir, Path(key).name)))
+
+    print(f"{len(todo)} of {len(files)} raw files to process ({len(files) - len(todo)} unchanged)")
+    for name in stale_entries(files, ingest):
+        print(f"Note: {name} was ingested before but is no longer in {raw_spec}; its output was kept")
+
+    for raw_path, reason, digest in todo:
+        stem = raw_stem(raw_path)
+        out_path = out_dir / (stem if args.format == "parquet" else csv_name(stem, args.compression))
+        print(f"Processing {raw_path.name} ({reason}) -> {out_path}")
+        if reason != "new":
+            # A checkpoint from the old file content must not be resumed
+            manifest_path(out_path).unlink(missing_ok=True)
+        kept = run_file(raw_path, out_path, args, prof=prof, index=index, lookups=lookups)
+        if kept is not None:
+            save_keys(keys_path(out_dir, raw_path.name), kept)
+        previous = ingest["files"].get(manifest_key(raw_path), {}).get("out")
+        if previous is not None and Path(previous) != out_path and Path(previous).resolve().parent == out_dir.resolve():
+            # Output in the old format/compression: readers of out_dir would pick it up next to the new one
+            remove_output(Path(previous))
+        record_ingested(
+            ingest, raw_path, out_path, digest, column_profile=args.columns, dedup=args.dedup,
+            fmt=args.format, compression=args.compression,
+        )
+        save_ingest_manifest(out_dir, ingest)
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--raw", required=True, help="Path to raw CSV (large file)")
-    ap.add_argument("--out", required=True, help="Path to output cleaned CSV")
+    ap.add_argument("--raw", required=True,
+                    help="Path to raw CSV (large file), or a directory / glob of monthly raw files")
+    ap.add_argument("--out", default=None,
+                    help="Path to output cleaned CSV (or dataset directory for parquet); "
+                         "a directory when --raw names several files")
     ap.add_argument("--chunksize", type=int, default=500_000)
+    ap.add_argument("--memory-budget", type=parse_size, default=None,
+                    help="Adapt the chunk size to stay under this much memory (e.g. 2G); overrides --chunksize")
+    ap.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                    help="csv: single file; parquet: dataset partitioned by year/month")
+    ap.add_argument("--columns", choices=list(ETL_PROFILES), default="default",
+                    help="Column profile: what is parsed, derived and written "
+                         "(dashboard-lean: only what the cubes need; analysis-extended: adds distance, taxi times, ...)")
+    ap.add_argument("--compression", choices=list(OUTPUT_COMPRESSIONS), default="none",
+                    help="Compress the outputs: .csv.gz/.csv.zst files, or the Parquet codec (none = snappy)")
+    ap.add_argument("--cluster", action="store_true",
+                    help="Sort the output by " + ", ".join(CLUSTER_KEYS) + " so build_dashboard_tables "
+                         "can aggregate it as a stream")
+    ap.add_argument("--no-validate", dest="validate", action="store_false",
+                    help="Skip the raw-row checks (keys, dates, codes, states, HHMM times, delay ranges) "
+                         "and the _quarantine/ sidecar")
+    ap.add_argument("--dedup", action="store_true",
+                    help="Drop repeated flights (same date, carrier, flight number, origin and scheduled departure), "
+                         "within a file and across the files of a multi-file --raw")
+    ap.add_argument("--reader", choices=CSV_READERS, default="pandas", help="CSV parser backend for the raw file")
+    ap.add_argument("--workers", type=int, default=1, help="Processes used to transform chunks (1 = serial)")
+    ap.add_argument("--checkpoint", action="store_true",
+                    help="Record finished chunks in <out>.manifest.json so the run can be resumed")
+    ap.add_argument("--resume", action="store_true",
+                    help="Continue an interrupted --checkpoint run from its manifest (implies --checkpoint)")
+    ap.add_argument("--cubes-out", default=None,
+                    help="Fused mode: also build the dashboard cubes into this directory in the same pass")
+    ap.add_argument("--top_airports", type=int, default=150, help="Airports kept in cube_airport_top (fused mode)")
+    ap.add_argument("--lookups-out", default=None,
+                    help="Also write airlines.csv/airports.csv (with the curated airline names) into this directory, "
+                         "so build_lookups.py does not need another pass")
+    ap.add_argument("--profile", default=None, metavar="REPORT.json",
+                    help="Record time, rows/s and peak memory per stage and chunk into this JSON report")
     args = ap.parse_args()
+    prof = Profiler("process_flight_data_in_chunks") if args.profile else DISABLED
+
+    if args.out is None and args.cubes_out is None and args.lookups_out is None:
+        ap.error("give --out, --cubes-out and/or --lookups-out")
+    clean_cols = ETL_PROFILES[args.columns]["clean"]
+    if args.lookups_out is not None and clean_cols is not None and not set(
+        LOOKUP_AIRLINE_COLS + LOOKUP_AIRPORT_COLS
+    ) <= set(clean_cols):
+        ap.error(f"--lookups-out needs the airport city/state columns, which --columns {args.columns} does not keep")
+    if args.cubes_out is not None and (args.resume or is_multi_raw(args.raw)):
+        ap.error("--cubes-out needs a single --raw file and cannot be combined with --resume")
+    if args.lookups_out is not None and args.resume:
+        ap.error("--lookups-out cannot be combined with --resume")
+    if args.out is None and is_multi_raw(args.raw):
+        ap.error("a multi-file --raw needs --out (the directory the per-file outputs and manifest go to)")
+    if args.out is None and (args.checkpoint or args.resume):
+        ap.error("--checkpoint/--resume need --out")
+    if args.cluster and (args.checkpoint or args.resume):
+        ap.error("--cluster cannot be combined with --checkpoint/--resume")
+    if args.dedup and (args.checkpoint or args.resume):
+        ap.error("--dedup cannot be combined with --checkpoint/--resume")
 
-    raw_path = Path(args.raw)
-    out_path = Path(args.out)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path = Path(args.out) if args.out is not None else None
+    if out_path is not None and args.format == "csv" and not is_multi_raw(args.raw):
+        out_path = with_csv_suffix(out_path, args.compression)
+    accs = {} if args.cubes_out is not None else None
+    lookups = LookupCollector() if args.lookups_out is not None else None
 
-    first = True
-    for chunk in pd.read_csv(raw_path, chunksize=args.chunksize, low_memory=False):
-        cleaned = process_chunk(chunk)
-        cleaned.to_csv(out_path, mode="w" if first else "a", header=first, index=False)
-        first = False
+    if is_multi_raw(args.raw):
+        run_many(args.raw, out_path, args, prof, lookups=lookups)
+    else:
+        if out_path is not None:
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+        run_file(Path(args.raw), out_path, args, accs=accs, prof=prof, lookups=lookups)
 
-    print(f"Done. Wrote dashboard-ready dataset to: {out_path}")
+    if out_path is not None:
+        print(f"Done. Wrote dashboard-ready dataset to: {out_path}")
+    if accs is not None:
+        write_tables(cube_frames(accs, prof), Path(args.cubes_out), top_airports=args.top_airports, compression=args.compression, prof=prof)
+        print(f"Done. Wrote dashboard tables to: {args.cubes_out}")
+    if lookups is not None:
+        # A multi-file run only reads new/changed files, so keep what the lookups already list
+        lookups.write(Path(args.lookups_out), prof, keep_existing=is_multi_raw(args.raw), fill_names=True)
+    report_io_savings()
+    if args.memory_budget is not None:
+        report_peak_rss()
+    if args.profile:
+        prof.write(Path(args.profile), config=vars(args))
 
 if __name__ == "__main__":
     main()
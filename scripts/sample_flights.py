@@ -0,0 +1,126 @@
+import argparse
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dashboard_agg.compression import OUTPUT_COMPRESSIONS, with_csv_suffix, write_csv
+from dashboard_agg.storage import clean_csv_files, is_parquet_path, iter_clean_chunks, iter_csv_chunks
+
+# (month, carrier) columns of the raw BTS export and of the cleaned dataset
+STRATA_COLUMNS = [["month", "op_unique_carrier"], ["month", "operating_airline"]]
+
+
+def iter_input(path: Path, chunksize: int) -> Iterable[pd.DataFrame]:
+    # CSV cells are kept as text so sampled rows are written back unchanged
+    if is_parquet_path(path):
+        yield from iter_clean_chunks(path, chunksize=chunksize)
+        return
+    for csv_path in clean_csv_files(path):
+        yield from iter_csv_chunks(csv_path, chunksize, dtypes=defaultdict(lambda: str))
+
+
+def strata_for(columns: pd.Index) -> list[str]:
+    for strata in STRATA_COLUMNS:
+        if all(c in columns for c in strata):
+            return strata
+    raise ValueError(f"input has none of the stratum column pairs {STRATA_COLUMNS}")
+
+
+def bottom_k(df: pd.DataFrame, k: int, by: Optional[list[str]] = None) -> pd.DataFrame:
+    # Rows with the k smallest random keys, overall or per stratum
+    if by is not None:
+        rank = df.groupby(by, dropna=False, sort=False)["_u"].rank(method="first")
+        return df[rank.to_numpy() <= k]
+    if len(df) <= k:
+        return df
+    return df.iloc[np.argpartition(df["_u"].to_numpy(), k - 1)[:k]]
+
+
+def stratified_sample(
+    chunks: Iterable[pd.DataFrame],
+    rows: int,
+    min_per_stratum: int,
+    seed: int = 42,
+) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    One pass over the chunks. Every row gets a uniform random key; the `rows`
+    smallest keys overall form a uniform (proportional) sample, and the
+    `min_per_stratum` smallest keys of every (month, carrier) stratum are
+    added so small carriers and months stay represented. Only those rows are
+    ever held, so memory does not grow with the input. Keys are drawn in file
+    order from `seed`, so the sample does not depend on the chunk size.
+
+    Returns the sample in input order and the row count of every stratum.
+    """
+    rng = np.random.default_rng(seed)
+    uniform: Optional[pd.DataFrame] = None
+    floor: Optional[pd.DataFrame] = None
+    counts: Optional[pd.Series] = None
+    strata: Optional[list[str]] = None
+    offset = 0
+
+    for chunk in chunks:
+        if strata is None:
+            strata = strata_for(chunk.columns)
+        n = len(chunk)
+        chunk = chunk.assign(_u=rng.random(n), _row=np.arange(offset, offset + n))
+        offset += n
+
+        size = chunk.groupby(strata, dropna=False, sort=False).size()
+        counts = size if counts is None else counts.add(size, fill_value=0)
+
+        if rows > 0:
+            if uniform is not None and len(uniform) == rows:
+                # Only keys below the current k-th smallest can enter the sample
+                chunk_uniform = chunk[chunk["_u"].to_numpy() < uniform["_u"].max()]
+            else:
+                chunk_uniform = chunk
+            uniform = bottom_k(pd.concat([uniform, chunk_uniform]) if uniform is not None else chunk_uniform, rows)
+        if min_per_stratum > 0:
+            chunk_floor = bottom_k(chunk, min_per_stratum, by=strata)
+            floor = bottom_k(pd.concat([floor, chunk_floor]) if floor is not None else chunk_floor, min_per_stratum, by=strata)
+
+    parts = [p for p in [uniform, floor] if p is not None]
+    if not parts:
+        raise ValueError("input has no rows")
+    sample = pd.concat(parts).drop_duplicates("_row").sort_values("_row")
+    return sample.drop(columns=["_u", "_row"]), counts.astype("int64")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stratified random sample of a raw or cleaned flight file, in one pass")
+    ap.add_argument("--infile", required=True,
+                    help="Raw BTS CSV or cleaned dataset (CSV file/directory, optionally compressed, or Parquet)")
+    ap.add_argument("--out", required=True, help="Sample CSV to write")
+    ap.add_argument("--rows", type=int, default=10_000, help="Rows in the uniform part of the sample")
+    ap.add_argument("--min-per-stratum", type=int, default=25,
+                    help="Rows guaranteed for every (month, carrier), on top of --rows where needed")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--chunksize", type=int, default=500_000)
+    ap.add_argument("--compression", choices=list(OUTPUT_COMPRESSIONS), default="none")
+    args = ap.parse_args()
+
+    if args.rows < 0 or args.min_per_stratum < 0:
+        ap.error("--rows and --min-per-stratum must be >= 0")
+    if args.rows == 0 and args.min_per_stratum == 0:
+        ap.error("give --rows or --min-per-stratum")
+
+    sample, counts = stratified_sample(
+        iter_input(Path(args.infile), args.chunksize), args.rows, args.min_per_stratum, args.seed
+    )
+
+    out = with_csv_suffix(Path(args.out), args.compression)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    write_csv(sample, out, args.compression)
+
+    total = int(counts.sum())
+    print(f"Read {total:,} rows in {len(counts):,} (month, carrier) strata")
+    print(f"Smallest stratum: {counts.min():,} rows; largest: {counts.max():,} rows")
+    print(f"Wrote {len(sample):,} sampled rows ({len(sample) / max(total, 1):.2%}) to: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = ROOT / "scripts"
+
+# The scripts import each other and dashboard_agg with scripts/ on sys.path
+sys.path.insert(0, str(SCRIPTS))
+
+
+@pytest.fixture
+def raw_sample() -> Path:
+    return ROOT / "data" / "raw" / "flight_data_2024_sample.csv"
+
+
+@pytest.fixture
+def run_script():
+    # Run a script as the CLI does; returns its stdout
+    def run(name: str, *args) -> str:
+        cmd = [sys.executable, str(SCRIPTS / name), *map(str, args)]
+        return subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    return run
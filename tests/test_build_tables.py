@@ -0,0 +1,28 @@
+import filecmp
+
+import pandas as pd
+import pytest
+
+from dashboard_agg.pipeline import build_tables
+
+
+def test_years_filter_on_csv(tmp_path, raw_sample, run_script):
+    clean = tmp_path / "clean.csv"
+    run_script("process_flight_data_in_chunks.py", "--raw", raw_sample, "--out", clean)
+    one_year = pd.read_csv(clean, low_memory=False)
+    assert set(one_year["year"]) == {2024}
+    two_years = tmp_path / "two_years.csv"
+    pd.concat([one_year, one_year.assign(year=2023)]).to_csv(two_years, index=False)
+
+    build_tables(clean, tmp_path / "expected")
+    build_tables(two_years, tmp_path / "filtered", years=[2024])
+    cubes = sorted(p.name for p in (tmp_path / "expected").iterdir())
+    match, mismatch, errors = filecmp.cmpfiles(tmp_path / "expected", tmp_path / "filtered", cubes, shallow=False)
+    assert match == cubes, (mismatch, errors)
+
+
+def test_years_filter_without_year_column(tmp_path):
+    no_year = tmp_path / "no_year.csv"
+    pd.DataFrame({"month": [1], "origin_airport": ["JFK"]}).to_csv(no_year, index=False)
+    with pytest.raises(ValueError, match="year"):
+        build_tables(no_year, tmp_path / "out", years=[2024])
@@ -0,0 +1,12 @@
+from dashboard_agg.ingest import plan_ingest, record_ingested
+
+
+def test_output_settings_changes_reprocess(tmp_path):
+    raw = tmp_path / "jan.csv"
+    raw.write_text("Year,Month\n2024,1\n")
+    manifest = {"files": {}}
+    record_ingested(manifest, raw, tmp_path / "out" / "jan", fmt="parquet", compression="none")
+
+    assert plan_ingest([raw], manifest, fmt="parquet") == []
+    assert plan_ingest([raw], manifest, fmt="csv") == [(raw, "format changed", None)]
+    assert plan_ingest([raw], manifest, fmt="parquet", compression="zstd") == [(raw, "compression changed", None)]
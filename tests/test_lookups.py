@@ -0,0 +1,16 @@
+import io
+
+import pandas as pd
+
+from dashboard_agg.lookups import fill_airline_names
+from dashboard_agg.schema import FILL_AIRLINE_COLS, LOOKUP_AIRLINE_DTYPES, usecols_for
+
+
+def test_fill_airline_names_fills_empty_cells():
+    # Read the way fill_airline_lookup.py does: an empty cell is <NA> under the string dtype
+    csv = io.StringIO("operating_airline,airline_name\nAA,\nDL,Delta (custom)\nZZ,\n")
+    df = pd.read_csv(csv, usecols=usecols_for(FILL_AIRLINE_COLS), dtype=LOOKUP_AIRLINE_DTYPES)
+    assert df["airline_name"].isna().sum() == 2
+
+    out = fill_airline_names(df)
+    assert out["airline_name"].tolist() == ["American Airlines", "Delta (custom)", ""]
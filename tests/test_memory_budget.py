@@ -0,0 +1,29 @@
+import re
+from pathlib import Path
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not Path("/proc/self/status").exists(), reason="needs Linux RSS accounting")
+
+UNITS = {"B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+
+
+def peak_rss(output: str) -> int:
+    m = re.search(r"Peak RSS: ([\d,.]+) (\w+)", output)
+    assert m, output
+    return int(float(m.group(1).replace(",", "")) * UNITS[m.group(2)])
+
+
+def test_etl_peak_rss_stays_under_budget(tmp_path, raw_sample, run_script):
+    # 400k rows: in one default 500k-row chunk the ETL peaks well over 300 MB
+    lines = raw_sample.read_text().splitlines(keepends=True)
+    raw = tmp_path / "raw.csv"
+    with open(raw, "w") as f:
+        f.write(lines[0])
+        for _ in range(40):
+            f.writelines(lines[1:])
+
+    out = run_script("process_flight_data_in_chunks.py", "--raw", raw, "--out", tmp_path / "clean.csv",
+                     "--memory-budget", "200M")
+    assert "chunksize" in out
+    assert peak_rss(out) <= 200 << 20